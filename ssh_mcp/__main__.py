@@ -5,10 +5,10 @@ This module provides a simple command-line interface to run the SSH-MCP server.
 """
 
 import argparse
-import os
 import sys
 from typing import Optional
 
+from .config import DEFAULT_CONFIG_PATH
 from .server import SSHMCPServer
 
 
@@ -25,7 +25,7 @@ def main() -> int:
     parser.add_argument(
         "--config",
         help="Path to the configuration file (default: ~/.ssh-mcp-config.yaml)",
-        default=os.path.expanduser("~/.ssh-mcp-config.yaml"),
+        default=DEFAULT_CONFIG_PATH,
     )
     parser.add_argument(
         "--name",
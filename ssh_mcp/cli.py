@@ -4,14 +4,36 @@ SSH-MCP CLI tool.
 
 This script provides a command-line interface for working with SSH-MCP.
 """
+
 import argparse
 import os
 import sys
-from typing import List, Optional
+from typing import Callable, Dict, List, Optional, TextIO, Union
+
+from ssh_mcp.config import DEFAULT_CONFIG_PATH, ConfigurationManager
+
+# The MCP server, executor and daemon are imported inside the handlers that use
+# them, so list-* and init don't pay for importing the MCP stack.
 
-from ssh_mcp.config import ConfigurationManager
-from ssh_mcp.executor import CommandExecutor
-from ssh_mcp.server import SSHMCPServer
+
+def _write_output(stream: TextIO, output: Union[str, bytes]) -> None:
+    """
+    Write command output to a standard stream.
+
+    Bytes are written to the stream's binary buffer as-is, skipping a decode
+    and re-encode of output that is only passed through.
+
+    Args:
+        stream: sys.stdout or sys.stderr.
+        output: The command output.
+    """
+    if isinstance(output, str):
+        stream.write(output)
+        return
+
+    stream.flush()
+    stream.buffer.write(output)
+    stream.buffer.flush()
 
 
 def run_server(args: argparse.Namespace) -> int:
@@ -24,6 +46,8 @@ def run_server(args: argparse.Namespace) -> int:
     Returns:
         Exit code (0 for success, non-zero for failure).
     """
+    from ssh_mcp.server import SSHMCPServer
+
     try:
         server = SSHMCPServer(server_name=args.name, config_path=args.config)
         server.run()
@@ -48,19 +72,27 @@ def run_command(args: argparse.Namespace) -> int:
     Returns:
         Exit code (0 for success, non-zero for failure).
     """
-    try:
-        config_manager = ConfigurationManager(args.config)
-        executor = CommandExecutor(config_manager=config_manager)
+    from ssh_mcp import daemon
+    from ssh_mcp.executor import CommandExecutor
 
-        result = executor.execute_command(
-            args.connection, args.remote_command, timeout=args.timeout
-        )
+    try:
+        if args.persistent:
+            result = daemon.execute_command(
+                args.config, args.connection, args.remote_command, timeout=args.timeout
+            )
+        else:
+            config_manager = ConfigurationManager(args.config)
+            executor = CommandExecutor(config_manager=config_manager)
+
+            result = executor.execute_command(
+                args.connection, args.remote_command, timeout=args.timeout, binary=True
+            )
 
         if result["stdout"]:
-            print(result["stdout"], end="")
+            _write_output(sys.stdout, result["stdout"])
 
         if result["stderr"]:
-            print(result["stderr"], end="", file=sys.stderr)
+            _write_output(sys.stderr, result["stderr"])
 
         if result["error"]:
             print(f"Error: {result['error']}", file=sys.stderr)
@@ -72,6 +104,33 @@ def run_command(args: argparse.Namespace) -> int:
         return 1
 
 
+def run_daemon(args: argparse.Namespace) -> int:
+    """
+    Run the connection daemon used by `run --persistent`.
+
+    Args:
+        args: Command-line arguments.
+
+    Returns:
+        Exit code (0 for success, non-zero for failure).
+    """
+    from ssh_mcp import daemon
+
+    try:
+        connection_daemon = daemon.ConnectionDaemon(
+            args.config, idle_timeout=args.idle_timeout
+        )
+        connection_daemon.serve()
+        return 0
+
+    except KeyboardInterrupt:
+        return 0
+
+    except Exception as e:
+        print(f"Error running daemon: {str(e)}", file=sys.stderr)
+        return 1
+
+
 def list_connections(args: argparse.Namespace) -> int:
     """
     List available connections.
@@ -152,6 +211,17 @@ def init_config(args: argparse.Namespace) -> int:
         return 1
 
 
+# Subcommand name to handler
+COMMAND_HANDLERS: Dict[str, Callable[[argparse.Namespace], int]] = {
+    "server": run_server,
+    "run": run_command,
+    "daemon": run_daemon,
+    "list-connections": list_connections,
+    "list-commands": list_commands,
+    "init": init_config,
+}
+
+
 def main() -> int:
     """
     Main entry point for the SSH-MCP CLI.
@@ -165,7 +235,7 @@ def main() -> int:
     parser.add_argument(
         "--config",
         help="Path to the configuration file (default: ~/.ssh-mcp-config.yaml)",
-        default=os.path.expanduser("~/.ssh-mcp-config.yaml"),
+        default=DEFAULT_CONFIG_PATH,
     )
 
     subparsers = parser.add_subparsers(dest="command", help="Command to run")
@@ -186,6 +256,22 @@ def main() -> int:
         type=int,
         default=None,
     )
+    run_parser.add_argument(
+        "--persistent",
+        help="Reuse SSH connections across runs through a background daemon",
+        action="store_true",
+    )
+
+    # Daemon command
+    daemon_parser = subparsers.add_parser(
+        "daemon", help="Run the connection daemon used by run --persistent"
+    )
+    daemon_parser.add_argument(
+        "--idle-timeout",
+        help="Exit after this many seconds without requests (default: 600)",
+        type=int,
+        default=600,
+    )
 
     # List connections command
     list_connections_parser = subparsers.add_parser(
@@ -203,20 +289,13 @@ def main() -> int:
 
     args = parser.parse_args()
 
-    if args.command == "server":
-        return run_server(args)
-    elif args.command == "run":
-        return run_command(args)
-    elif args.command == "list-connections":
-        return list_connections(args)
-    elif args.command == "list-commands":
-        return list_commands(args)
-    elif args.command == "init":
-        return init_config(args)
-    else:
+    handler = COMMAND_HANDLERS.get(args.command)
+    if handler is None:
         parser.print_help()
         return 1
 
+    return handler(args)
+
 
 if __name__ == "__main__":
     sys.exit(main())
@@ -4,13 +4,81 @@ Configuration manager for SSH-MCP.
 This module handles loading and validating configuration from ~/.ssh-mcp-config.yaml.
 """
 
+import hashlib
+import json
 import os
 import re
-from pathlib import Path
-from typing import Any, Dict, List, Optional
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
 
 import yaml
 
+# Default locations, resolved once at import.
+DEFAULT_CONFIG_PATH = os.path.expanduser("~/.ssh-mcp-config.yaml")
+DEFAULT_KEY_PATH = os.path.expanduser("~/.ssh/id_rsa")
+
+# Prefer the libyaml-backed loader/dumper when PyYAML was built with it.
+_YAML_LOADER = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+_YAML_DUMPER = getattr(yaml, "CSafeDumper", yaml.SafeDumper)
+
+# Matches ${VAR_NAME} references to environment variables.
+_ENV_VAR_RE = re.compile(r"\$\{([A-Za-z0-9_]+)\}")
+
+
+def _replace_env_var(match: re.Match[str]) -> str:
+    """Replace a ${VAR_NAME} match with the variable's value, if it is set."""
+    var_name = match.group(1)
+    return os.environ.get(var_name, f"${{{var_name}}}")
+
+
+def _expand_env_vars(node: Any) -> Any:
+    """Recursively replace ${VAR_NAME} references in string values."""
+    if isinstance(node, str):
+        if "${" not in node:
+            return node
+        return _ENV_VAR_RE.sub(_replace_env_var, node)
+    if isinstance(node, dict):
+        return {key: _expand_env_vars(value) for key, value in node.items()}
+    if isinstance(node, list):
+        return [_expand_env_vars(item) for item in node]
+    return node
+
+
+# Fields every connection must define.
+_REQUIRED_FIELDS = ("hostname", "username")
+
+# YAML documents parsed by this process, before environment variables are
+# expanded, keyed on the SHA-256 hex digest of the file content they were
+# parsed from. Least recently used entries are evicted beyond
+# _CONFIG_CACHE_SIZE.
+_CONFIG_CACHE: "OrderedDict[str, Any]" = OrderedDict()
+_CONFIG_CACHE_SIZE = 100
+
+# Directory holding parsed-config caches, one file per configuration path.
+_CACHE_DIR = os.path.join(
+    os.environ.get("XDG_CACHE_HOME") or os.path.expanduser("~/.cache"), "ssh-mcp"
+)
+
+# Parsed-config cache files kept in _CACHE_DIR; the least recently written
+# are removed beyond this.
+_CACHE_DIR_SIZE = 100
+
+
+def _prune_cache_dir() -> None:
+    """Remove the oldest parsed-config cache files beyond _CACHE_DIR_SIZE."""
+    try:
+        entries = [
+            entry for entry in os.scandir(_CACHE_DIR) if entry.name.endswith(".json")
+        ]
+        if len(entries) <= _CACHE_DIR_SIZE:
+            return
+
+        entries.sort(key=lambda entry: entry.stat().st_mtime_ns)
+        for entry in entries[: len(entries) - _CACHE_DIR_SIZE]:
+            os.unlink(entry.path)
+    except OSError:
+        pass
+
 
 class ConfigurationManager:
     """Manages SSH-MCP configuration from ~/.ssh-mcp-config.yaml."""
@@ -23,7 +91,13 @@ class ConfigurationManager:
             config_path: Optional path to the configuration file.
                          If not provided, defaults to ~/.ssh-mcp-config.yaml.
         """
-        self.config_path = config_path or os.path.expanduser("~/.ssh-mcp-config.yaml")
+        self.config_path = config_path or DEFAULT_CONFIG_PATH
+
+        # (mtime_ns, size) of the file self.config was loaded from, and a
+        # counter bumped each time a reload replaces self.config
+        self._stamp: Optional[Tuple[int, int]] = None
+        self.version = 0
+
         self.config = self._load_config()
 
     def _load_config(self) -> Dict[str, Any]:
@@ -37,26 +111,154 @@ class ConfigurationManager:
             FileNotFoundError: If the configuration file is not found.
             yaml.YAMLError: If the configuration file is invalid YAML.
         """
-        config_file = Path(self.config_path)
-
-        if not config_file.exists():
-            # Create default configuration if not present
+        try:
+            stat = os.stat(self.config_path)
+        except FileNotFoundError:
+            # Create default configuration if not present. The default is valid
+            # by construction, so it is returned without going through
+            # _process_env_vars and _validate_config.
             default_config = self._create_default_config()
-            with open(config_file, "w") as f:
-                yaml.dump(default_config, f, default_flow_style=False)
-            return default_config
+            if self._write_default_config(default_config):
+                self._stamp = None
+                return default_config
+
+            # Another process created the file first, so load theirs
+            stat = os.stat(self.config_path)
+
+        stamp = (stat.st_mtime_ns, stat.st_size)
+
+        with open(self.config_path, "rb") as f:
+            data = f.read()
+
+        # Both parse caches are keyed on the file content rather than its
+        # mtime, so they cannot be fooled by clock skew or coarse timestamps
+        digest = hashlib.sha256(data).hexdigest()
 
-        with open(config_file, "r") as f:
-            config = yaml.safe_load(f)
+        # Reuse a document already parsed by this process, then one cached on
+        # disk, before parsing the YAML
+        document = _CONFIG_CACHE.get(digest)
+        if document is None:
+            document = self._read_cached_config(digest)
+            if document is None:
+                document = yaml.load(data, Loader=_YAML_LOADER)
+                self._write_cached_config(digest, document)
 
-        # Process environment variables in the config
-        config = self._process_env_vars(config)
+        # Process environment variables in the config. This runs on every load,
+        # so each manager sees the current environment, and it rebuilds every
+        # dict and list, so the cached document is never handed out or mutated.
+        config = self._process_env_vars(document)
 
         # Validate the configuration
         self._validate_config(config)
 
+        _CONFIG_CACHE[digest] = document
+        _CONFIG_CACHE.move_to_end(digest)
+        while len(_CONFIG_CACHE) > _CONFIG_CACHE_SIZE:
+            _CONFIG_CACHE.popitem(last=False)
+
+        # Only record the file as loaded once it has parsed and validated, so
+        # a reload keeps failing until a broken file is fixed
+        self._stamp = stamp
         return config
 
+    def _write_default_config(self, default_config: Dict[str, Any]) -> bool:
+        """
+        Write the default configuration to the config file if it does not exist.
+
+        The file is created exclusively, so concurrent first runs never
+        overwrite each other's file.
+
+        Args:
+            default_config: The default configuration.
+
+        Returns:
+            True if the file was created, False if it already existed.
+        """
+        data = yaml.dump(
+            default_config, Dumper=_YAML_DUMPER, default_flow_style=False
+        ).encode("utf-8")
+
+        try:
+            fd = os.open(self.config_path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+        except FileExistsError:
+            return False
+
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+
+        return True
+
+    def _cache_path(self) -> str:
+        """
+        Get the path of the parsed-config cache for this configuration file.
+
+        Returns:
+            Path to the cache file.
+        """
+        digest = hashlib.sha256(
+            os.path.abspath(self.config_path).encode("utf-8")
+        ).hexdigest()
+        return os.path.join(_CACHE_DIR, f"{digest[:16]}.json")
+
+    def _read_cached_config(self, digest: str) -> Optional[Any]:
+        """
+        Read the parsed configuration from the cache if it is still fresh.
+
+        The cache holds the YAML document as parsed, before environment
+        variables are substituted, so secrets taken from the environment
+        are never written to disk.
+
+        Args:
+            digest: SHA-256 hex digest of the configuration file's content.
+
+        Returns:
+            The cached document, or None if the cache is missing or stale.
+        """
+        try:
+            with open(self._cache_path(), "rb") as f:
+                cached = json.load(f)
+        except Exception:
+            return None
+
+        if not isinstance(cached, dict) or cached.get("sha256") != digest:
+            return None
+
+        return cached.get("config")
+
+    def _write_cached_config(self, digest: str, config: Any) -> None:
+        """
+        Write the parsed configuration to the cache as JSON.
+
+        Documents that do not survive a JSON round trip unchanged (dates,
+        non-string keys) are not cached. Failures are ignored; the cache is
+        only an optimization. The oldest cache files are pruned so that at
+        most _CACHE_DIR_SIZE are kept.
+
+        Args:
+            digest: SHA-256 hex digest of the configuration file's content.
+            config: The parsed YAML document.
+        """
+        cache_path = self._cache_path()
+        temp_path = f"{cache_path}.{os.getpid()}.tmp"
+        try:
+            data = json.dumps({"sha256": digest, "config": config})
+            if json.loads(data)["config"] != config:
+                return
+
+            os.makedirs(_CACHE_DIR, mode=0o700, exist_ok=True)
+            fd = os.open(temp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+            with os.fdopen(fd, "w") as f:
+                f.write(data)
+            os.replace(temp_path, cache_path)
+        except Exception:
+            try:
+                os.unlink(temp_path)
+            except OSError:
+                pass
+            return
+
+        _prune_cache_dir()
+
     def _create_default_config(self) -> Dict[str, Any]:
         """
         Create a default configuration.
@@ -71,7 +273,9 @@ class ConfigurationManager:
                     "port": 22,
                     "username": "user",
                     "auth_method": "key",
-                    "key_path": os.path.expanduser("~/.ssh/id_rsa"),
+                    "key_path": DEFAULT_KEY_PATH,
+                    "compress": True,
+                    "keepalive": 30,  # seconds, 0 to disable
                 }
             },
             "defaults": {
@@ -95,26 +299,15 @@ class ConfigurationManager:
         """
         Process environment variables in the configuration.
 
+        Only string values are rewritten; keys and non-string values are kept as-is.
+
         Args:
             config: The configuration dict.
 
         Returns:
             Dict with environment variables replaced.
         """
-        # Convert the config to a string
-        config_str = yaml.dump(config)
-
-        # Replace environment variables (${VAR_NAME})
-        pattern = r"\${([A-Za-z0-9_]+)}"
-
-        def replace_env_var(match):
-            var_name = match.group(1)
-            return os.environ.get(var_name, f"${{{var_name}}}")
-
-        config_str = re.sub(pattern, replace_env_var, config_str)
-
-        # Convert back to a dict
-        return yaml.safe_load(config_str)
+        return _expand_env_vars(config)
 
     def _validate_config(self, config: Dict[str, Any]) -> None:
         """
@@ -139,32 +332,27 @@ class ConfigurationManager:
             if not isinstance(conn, dict):
                 raise ValueError(f"Connection '{name}' must be a dictionary")
 
-            required_fields = ["hostname", "username"]
-            for field in required_fields:
-                if field not in conn:
-                    raise ValueError(
-                        f"Connection '{name}' is missing required field '{field}'"
-                    )
-
-            if "auth_method" not in conn:
-                conn["auth_method"] = "key"  # Default to key-based auth
-
-            if conn["auth_method"] not in ["key", "password"]:
+            missing = [field for field in _REQUIRED_FIELDS if field not in conn]
+            if missing:
                 raise ValueError(
-                    f"Connection '{name}' has invalid auth_method '{conn['auth_method']}'"
+                    f"Connection '{name}' is missing required field '{missing[0]}'"
                 )
 
-            if conn["auth_method"] == "key" and "key_path" not in conn:
-                # Default to ~/.ssh/id_rsa if not specified
-                conn["key_path"] = os.path.expanduser("~/.ssh/id_rsa")
+            auth_method = conn.setdefault("auth_method", "key")  # Default to key auth
 
-            if conn["auth_method"] == "password" and "password" not in conn:
+            if auth_method == "key":
+                # Default to ~/.ssh/id_rsa if not specified
+                conn.setdefault("key_path", DEFAULT_KEY_PATH)
+            elif auth_method != "password":
+                raise ValueError(
+                    f"Connection '{name}' has invalid auth_method '{auth_method}'"
+                )
+            elif "password" not in conn:
                 raise ValueError(
                     f"Connection '{name}' is missing required field 'password' for password authentication"
                 )
 
-            if "port" not in conn:
-                conn["port"] = 22  # Default SSH port
+            conn.setdefault("port", 22)  # Default SSH port
 
     def get_connection_config(self, connection_name: str) -> Dict[str, Any]:
         """
@@ -228,5 +416,16 @@ class ConfigurationManager:
         Reload the configuration from the config file.
 
         This allows runtime updates to the configuration without restarting the server.
+        The configuration is only reloaded, and version incremented, if the file's mtime
+        or size has changed since it was last loaded.
         """
+        try:
+            stat = os.stat(self.config_path)
+        except FileNotFoundError:
+            stat = None
+
+        if stat is not None and (stat.st_mtime_ns, stat.st_size) == self._stamp:
+            return
+
         self.config = self._load_config()
+        self.version += 1
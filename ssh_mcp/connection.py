@@ -5,14 +5,34 @@ This module handles establishing and managing SSH connections to remote servers.
 """
 
 import io
+import re
+import select
 import socket
+import threading
 import time
-from typing import Any, Dict, List, Optional, Tuple, Union
-
-import paramiko
+import uuid
+from typing import Any, Dict, List, Optional, Protocol, Tuple, Union
 
 from .config import ConfigurationManager
 
+# paramiko (and cryptography) is imported inside the methods that need it, so
+# commands that never open an SSH connection don't pay for importing it.
+
+# Size of each read from a command's output streams.
+READ_CHUNK_SIZE = 65536
+
+# Appended to output that was cut at the maximum output size.
+TRUNCATION_MARKER = "\n... (output truncated)"
+
+# Upper bound on the length of a batch sentinel line: a newline, the
+# 44-character sentinel, a space, an exit status and a newline.
+_SENTINEL_LINE_MAX = 64
+
+# Ciphers offered ahead of paramiko's defaults. AES-GCM encrypts and
+# authenticates in one pass, using AES-NI and carry-less multiply where the
+# CPU has them, instead of AES-CTR plus a separate HMAC.
+PREFERRED_CIPHERS = ("aes128-gcm@openssh.com", "aes256-gcm@openssh.com")
+
 
 class SSHConnectionError(Exception):
     """Exception raised for SSH connection errors."""
@@ -34,12 +54,19 @@ class SSHConnection:
         Raises:
             SSHConnectionError: If the connection cannot be established.
         """
+        import paramiko
+
         self.config = config
         self.timeout = timeout
         self.client = paramiko.SSHClient()
         self.client.set_missing_host_key_policy(paramiko.AutoAddPolicy())
+        self.transport: Optional[paramiko.Transport] = None
         self.connected = False
 
+        # Bounds the channels open at once on the shared transport; servers
+        # refuse sessions beyond their limit (OpenSSH MaxSessions, default 10)
+        self._sessions = threading.BoundedSemaphore(config.get("max_sessions", 10))
+
     def connect(self) -> None:
         """
         Establish the SSH connection.
@@ -47,12 +74,16 @@ class SSHConnection:
         Raises:
             SSHConnectionError: If the connection cannot be established.
         """
+        import paramiko
+
         try:
             connect_kwargs = {
                 "hostname": self.config["hostname"],
                 "port": self.config.get("port", 22),
                 "username": self.config["username"],
                 "timeout": self.timeout,
+                "compress": self.config.get("compress", True),
+                "transport_factory": _create_transport,
             }
 
             if self.config["auth_method"] == "password":
@@ -63,6 +94,13 @@ class SSHConnection:
                     connect_kwargs["key_filename"] = key_path
 
             self.client.connect(**connect_kwargs)
+
+            # Commands run as channels on this one transport, so keep it alive
+            # between commands on reused connections
+            self.transport = self.client.get_transport()
+            if self.transport is not None:
+                self.transport.set_keepalive(self.config.get("keepalive", 30))
+
             self.connected = True
 
         except (
@@ -78,10 +116,25 @@ class SSHConnection:
         """Close the SSH connection."""
         if self.connected:
             self.client.close()
+            self.transport = None
             self.connected = False
 
+    def is_active(self) -> bool:
+        """
+        Check whether the SSH connection is still usable.
+
+        Returns:
+            True if the connection is open and its transport is active.
+        """
+        return (
+            self.connected and self.transport is not None and self.transport.is_active()
+        )
+
     def execute_command(
-        self, command: str, timeout: Optional[int] = None
+        self,
+        command: str,
+        timeout: Optional[int] = None,
+        max_output_size: Optional[int] = None,
     ) -> Tuple[int, str, str]:
         """
         Execute a command on the remote server.
@@ -89,6 +142,8 @@ class SSHConnection:
         Args:
             command: The command to execute.
             timeout: Command execution timeout in seconds. If None, uses the default timeout.
+            max_output_size: Maximum number of bytes kept from each of stdout and stderr.
+                             Longer output is truncated. If None, output is not limited.
 
         Returns:
             Tuple of (exit_code, stdout, stderr).
@@ -96,75 +151,390 @@ class SSHConnection:
         Raises:
             SSHConnectionError: If the command execution fails.
         """
+        exit_code, stdout, stderr = self.execute_command_bytes(
+            command, timeout=timeout, max_output_size=max_output_size
+        )
+        return (
+            exit_code,
+            stdout.decode("utf-8", errors="replace"),
+            stderr.decode("utf-8", errors="replace"),
+        )
+
+    def execute_commands(
+        self,
+        commands: List[str],
+        timeout: Optional[int] = None,
+        max_output_size: Optional[int] = None,
+    ) -> List[Tuple[int, str, str]]:
+        """
+        Execute several commands in order over a single channel.
+
+        The commands run as one remote shell script, each followed by sentinel
+        lines on stdout and stderr that carry its exit status, and the output is
+        split back up per command. If a command ends the script (for example
+        with exit), it and the commands after it get an exit code of -1.
+
+        Args:
+            commands: The commands to execute.
+            timeout: Execution timeout in seconds per command. If None, uses the default timeout.
+            max_output_size: Maximum number of bytes kept from each command's stdout and
+                             stderr. Longer output is truncated. If None, output is not limited.
+
+        Returns:
+            List of (exit_code, stdout, stderr) tuples, one per command.
+
+        Raises:
+            SSHConnectionError: If the command execution fails.
+        """
+        sentinel = f"__SSH_MCP_{uuid.uuid4().hex}__"
+        script = "".join(
+            f"{command}\n"
+            f"printf '\\n{sentinel} %d\\n' $?\n"
+            f"printf '\\n{sentinel}\\n' >&2\n"
+            for command in commands
+        )
+
+        # Each sentinel line is preceded by an extra newline, so output that
+        # doesn't end in one cannot run into it
+        sentinel_bytes = re.escape(sentinel.encode("ascii"))
+        stdout = _BatchOutputBuffer(
+            re.compile(rb"\n" + sentinel_bytes + rb" (\d+)\n"), max_output_size
+        )
+        stderr = _BatchOutputBuffer(
+            re.compile(rb"\n" + sentinel_bytes + rb"\n"), max_output_size
+        )
+
+        self._run_command(
+            script, (timeout or self.timeout) * len(commands), stdout, stderr
+        )
+        return _batch_results(stdout, stderr, len(commands))
+
+    def execute_command_bytes(
+        self,
+        command: str,
+        timeout: Optional[int] = None,
+        max_output_size: Optional[int] = None,
+    ) -> Tuple[int, bytes, bytes]:
+        """
+        Execute a command on the remote server, returning its raw output.
+
+        Args:
+            command: The command to execute.
+            timeout: Command execution timeout in seconds. If None, uses the default timeout.
+            max_output_size: Maximum number of bytes kept from each of stdout and stderr.
+                             Longer output is truncated. If None, output is not limited.
+
+        Returns:
+            Tuple of (exit_code, stdout, stderr), with stdout and stderr undecoded.
+
+        Raises:
+            SSHConnectionError: If the command execution fails.
+        """
+        stdout = _OutputBuffer(max_output_size)
+        stderr = _OutputBuffer(max_output_size)
+        exit_code = self._run_command(command, timeout or self.timeout, stdout, stderr)
+        return exit_code, stdout.getvalue(), stderr.getvalue()
+
+    def _run_command(
+        self,
+        command: str,
+        timeout: float,
+        stdout: "_OutputSink",
+        stderr: "_OutputSink",
+    ) -> int:
+        """
+        Run a command on its own channel, writing its output to the given buffers.
+
+        Args:
+            command: The command to execute.
+            timeout: Command execution timeout in seconds.
+            stdout: Buffer receiving the command's stdout.
+            stderr: Buffer receiving the command's stderr.
+
+        Returns:
+            The command's exit code.
+
+        Raises:
+            SSHConnectionError: If the command execution fails.
+        """
+        import paramiko
+
         if not self.connected:
             self.connect()
 
-        cmd_timeout = timeout or self.timeout
-
         try:
-            # Execute the command
-            stdin, stdout, stderr = self.client.exec_command(
-                command, timeout=cmd_timeout
-            )
-
-            # Read output with a shorter timeout
-            stdout_str = ""
-            stderr_str = ""
-
-            # Set a shorter channel timeout for reading
-            stdout.channel.settimeout(5.0)
-            stderr.channel.settimeout(5.0)
-
-            try:
-                stdout_str = stdout.read().decode("utf-8")
-            except socket.timeout:
-                # If we timeout, we'll use what we have so far
-                pass
-
-            try:
-                stderr_str = stderr.read().decode("utf-8")
-            except socket.timeout:
-                # If we timeout, we'll use what we have so far
-                pass
-
-            # Get exit code (with a timeout)
-            exit_code = 0
-            try:
-                # Set a short timeout for getting the exit status
-                stdout.channel.settimeout(2.0)
-                exit_code = stdout.channel.recv_exit_status()
-            except socket.timeout:
-                # If we timeout waiting for the exit code, assume it's 0
-                # if we got stdout and no stderr
-                if stdout_str and not stderr_str:
-                    exit_code = 0
-                else:
-                    exit_code = -1
-
-            return exit_code, stdout_str, stderr_str
+            with self._sessions:
+                # Each command gets its own channel on the shared transport
+                if self.transport is None:
+                    raise paramiko.SSHException("SSH session not active")
+                channel = self.transport.open_session(timeout=timeout)
+                try:
+                    channel.settimeout(timeout)
+                    channel.exec_command(command)
+                    return _collect_output(channel, timeout, stdout, stderr)
+                finally:
+                    channel.close()
 
         except (paramiko.SSHException, socket.error, socket.timeout) as e:
             raise SSHConnectionError(f"Command execution failed: {str(e)}")
 
 
+class _OutputSink(Protocol):
+    """Receives a command's output stream as it is read from the channel."""
+
+    received: int
+
+    def write(self, data: bytes) -> None: ...
+
+
+class _OutputBuffer:
+    """Collects a command's output stream, keeping at most max_bytes of it."""
+
+    def __init__(self, max_bytes: Optional[int]):
+        """
+        Initialize the output buffer.
+
+        Args:
+            max_bytes: Maximum number of bytes to keep, or None for no limit.
+        """
+        self.max_bytes = max_bytes
+        self.received = 0
+        self._buffer = bytearray()
+        self._truncated = False
+
+    def write(self, data: bytes) -> None:
+        """
+        Append output, discarding whatever goes past max_bytes.
+
+        Args:
+            data: The output read from the channel.
+        """
+        self.received += len(data)
+        buffer = self._buffer
+        if self.max_bytes is None or len(buffer) + len(data) <= self.max_bytes:
+            buffer += data
+            return
+
+        if len(buffer) < self.max_bytes:
+            buffer += memoryview(data)[: self.max_bytes - len(buffer)]
+        self._truncated = True
+
+    def getvalue(self) -> bytes:
+        """
+        Get the output kept so far.
+
+        Returns:
+            The output, with TRUNCATION_MARKER appended if any was discarded.
+        """
+        if self._truncated:
+            return bytes(self._buffer) + TRUNCATION_MARKER.encode("utf-8")
+        return bytes(self._buffer)
+
+
+class _BatchOutputBuffer:
+    """
+    Splits a batch's output stream per command at its sentinel lines.
+
+    Each command's output is limited to max_bytes separately. Output past the
+    limit is still scanned for sentinels, so one verbose command does not hide
+    the results of the commands after it.
+    """
+
+    def __init__(self, sentinel_re: "re.Pattern[bytes]", max_bytes: Optional[int]):
+        """
+        Initialize the batch output buffer.
+
+        Args:
+            sentinel_re: Pattern matching the sentinel line that ends each
+                         command's output. A group, if any, is its exit code.
+            max_bytes: Maximum number of bytes kept from each command's output.
+        """
+        self.sentinel_re = sentinel_re
+        self.received = 0
+        self.segments: List[Tuple[Optional[int], bytes]] = []
+        self._current = _OutputBuffer(max_bytes)
+        self._pending = b""
+
+    def write(self, data: bytes) -> None:
+        """
+        Append output, closing a command's segment at each sentinel line.
+
+        Args:
+            data: The output read from the channel.
+        """
+        self.received += len(data)
+        data = self._pending + data
+
+        start = 0
+        for match in self.sentinel_re.finditer(data):
+            self._current.write(data[start : match.start()])
+            exit_code = int(match.group(1)) if self.sentinel_re.groups else None
+            self.segments.append((exit_code, self._current.getvalue()))
+            self._current = _OutputBuffer(self._current.max_bytes)
+            start = match.end()
+
+        # Hold back a tail that may be the start of a sentinel line split
+        # across reads. A sentinel line is at most _SENTINEL_LINE_MAX bytes.
+        keep = max(start, len(data) - _SENTINEL_LINE_MAX)
+        self._current.write(data[start:keep])
+        self._pending = data[keep:]
+
+    def finish(self) -> List[Tuple[Optional[int], bytes]]:
+        """
+        Get the output of every command, split at the sentinel lines.
+
+        Returns:
+            List of (exit_code, output) tuples, one per completed command with
+            its exit code (None on stderr), followed by the output written
+            after the last sentinel line with an exit code of None.
+        """
+        self._current.write(self._pending)
+        self._pending = b""
+        return self.segments + [(None, self._current.getvalue())]
+
+
+def _batch_results(
+    stdout: _BatchOutputBuffer, stderr: _BatchOutputBuffer, count: int
+) -> List[Tuple[int, str, str]]:
+    """
+    Combine a batch's split stdout and stderr into per-command results.
+
+    Args:
+        stdout: The batch's stdout, with a "<sentinel> <exit code>" line after each command.
+        stderr: The batch's stderr, with a "<sentinel>" line after each command.
+        count: The number of commands in the batch.
+
+    Returns:
+        List of (exit_code, stdout, stderr) tuples, one per command. Commands
+        that did not complete get an exit code of -1.
+    """
+    outputs = stdout.finish()
+    errors = stderr.finish()
+
+    results = []
+    for i in range(count):
+        exit_code, output = outputs[i] if i < len(outputs) else (None, b"")
+        error = errors[i][1] if i < len(errors) else b""
+        results.append(
+            (
+                -1 if exit_code is None else exit_code,
+                output.decode("utf-8", errors="replace"),
+                error.decode("utf-8", errors="replace"),
+            )
+        )
+
+    return results
+
+
+def _create_transport(sock: Any, **kwargs: Any) -> Any:
+    """
+    Create the transport for a new connection, preferring PREFERRED_CIPHERS.
+
+    Args:
+        sock: The connected socket.
+        **kwargs: Keyword arguments for paramiko.Transport.
+
+    Returns:
+        The paramiko.Transport.
+    """
+    import paramiko
+
+    transport = paramiko.Transport(sock, **kwargs)
+    options = transport.get_security_options()
+    ciphers = tuple(options.ciphers)
+    preferred = tuple(c for c in PREFERRED_CIPHERS if c in ciphers)
+    options.ciphers = preferred + tuple(c for c in ciphers if c not in preferred)
+    return transport
+
+
+def _collect_output(
+    channel: Any, timeout: float, stdout: _OutputSink, stderr: _OutputSink
+) -> int:
+    """
+    Read a command's output and exit status from its channel.
+
+    Args:
+        channel: The paramiko channel the command was started on.
+        timeout: Seconds to wait for the command before giving up on it.
+        stdout: Buffer receiving the command's stdout.
+        stderr: Buffer receiving the command's stderr.
+
+    Returns:
+        The command's exit code.
+    """
+    deadline = time.monotonic() + timeout
+
+    # Drain stdout and stderr together as data arrives, so a command
+    # writing to both never waits on the stream we are not reading.
+    while True:
+        ready = False
+        if channel.recv_ready():
+            stdout.write(channel.recv(READ_CHUNK_SIZE))
+            ready = True
+        if channel.recv_stderr_ready():
+            stderr.write(channel.recv_stderr(READ_CHUNK_SIZE))
+            ready = True
+
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            # The command ran past its timeout, use what we have so far
+            channel.close()
+            break
+
+        if ready:
+            continue
+
+        if channel.eof_received or channel.closed:
+            break
+
+        # The channel's fileno is signalled for stdout, stderr and close
+        select.select([channel], [], [], remaining)
+
+    # Get exit code (with a timeout), it may arrive just after EOF
+    if channel.status_event.wait(2.0):
+        return channel.recv_exit_status()
+    elif stdout.received and not stderr.received:
+        # If we timeout waiting for the exit code, assume it's 0
+        # if we got stdout and no stderr
+        return 0
+    else:
+        return -1
+
+
 class SSHConnectionManager:
-    """Manages multiple SSH connections."""
+    """
+    Manages multiple SSH connections.
 
-    def __init__(self, config_manager: ConfigurationManager):
+    Connections are kept open and reused by name. A background timer closes
+    connections that have been idle for longer than max_idle_time.
+    """
+
+    def __init__(self, config_manager: ConfigurationManager, max_idle_time: int = 300):
         """
         Initialize the SSH connection manager.
 
         Args:
             config_manager: The configuration manager.
+            max_idle_time: Idle time in seconds after which a connection is closed.
         """
         self.config_manager = config_manager
+        self.max_idle_time = max_idle_time
         self.connections: Dict[str, SSHConnection] = {}
         self.last_used: Dict[str, float] = {}
+        self._lock = threading.RLock()
+        self._cleanup_timer: Optional[threading.Timer] = None
+
+        # Serializes dialing per connection name, so a slow handshake only
+        # holds up callers waiting for that same connection
+        self._dial_locks: Dict[str, threading.Lock] = {}
 
     def get_connection(self, connection_name: str) -> SSHConnection:
         """
         Get an SSH connection by name.
 
+        An open connection is reused; a connection that has dropped is
+        replaced with a new one.
+
         Args:
             connection_name: The name of the connection.
 
@@ -175,26 +545,62 @@ class SSHConnectionManager:
             ValueError: If the connection name is not found in the configuration.
             SSHConnectionError: If the connection cannot be established.
         """
-        # Get connection if it already exists
-        if connection_name in self.connections:
-            # Update the last_used time
-            self.last_used[connection_name] = time.time()
-            return self.connections[connection_name]
+        with self._lock:
+            connection = self._get_active_connection(connection_name)
+            if connection is not None:
+                return connection
+            dial_lock = self._dial_locks.setdefault(connection_name, threading.Lock())
+
+        with dial_lock:
+            with self._lock:
+                # Another thread may have connected while we waited
+                connection = self._get_active_connection(connection_name)
+                if connection is not None:
+                    return connection
+
+                # Get connection configuration
+                connection_config = self.config_manager.get_connection_config(
+                    connection_name
+                )
+
+            # Create a new connection. The manager lock is not held while
+            # dialing, so other connections and the idle cleanup carry on.
+            connection = SSHConnection(
+                connection_config, timeout=self.config_manager.get_timeout()
+            )
+            connection.connect()
 
-        # Get connection configuration
-        connection_config = self.config_manager.get_connection_config(connection_name)
+            # Store the connection
+            with self._lock:
+                self.connections[connection_name] = connection
+                self.last_used[connection_name] = time.monotonic()
+                self._schedule_cleanup()
 
-        # Create a new connection
-        connection = SSHConnection(
-            connection_config, timeout=self.config_manager.get_timeout()
-        )
-        connection.connect()
+            return connection
 
-        # Store the connection
-        self.connections[connection_name] = connection
-        self.last_used[connection_name] = time.time()
+    def _get_active_connection(self, connection_name: str) -> Optional[SSHConnection]:
+        """
+        Get an open connection by name, closing it if it has dropped.
 
-        return connection
+        Must be called with the manager lock held.
+
+        Args:
+            connection_name: The name of the connection.
+
+        Returns:
+            The open connection, or None if there is none.
+        """
+        connection = self.connections.get(connection_name)
+        if connection is None:
+            return None
+
+        if connection.is_active():
+            # Update the last_used time
+            self.last_used[connection_name] = time.monotonic()
+            return connection
+
+        self.close_connection(connection_name)
+        return None
 
     def close_connection(self, connection_name: str) -> None:
         """
@@ -203,16 +609,40 @@ class SSHConnectionManager:
         Args:
             connection_name: The name of the connection.
         """
-        if connection_name in self.connections:
-            self.connections[connection_name].disconnect()
-            del self.connections[connection_name]
-            if connection_name in self.last_used:
-                del self.last_used[connection_name]
+        with self._lock:
+            if connection_name in self.connections:
+                self.connections[connection_name].disconnect()
+                del self.connections[connection_name]
+                if connection_name in self.last_used:
+                    del self.last_used[connection_name]
 
     def close_all_connections(self) -> None:
         """Close all SSH connections."""
-        for connection_name in list(self.connections.keys()):
-            self.close_connection(connection_name)
+        with self._lock:
+            if self._cleanup_timer is not None:
+                self._cleanup_timer.cancel()
+                self._cleanup_timer = None
+
+            for connection_name in list(self.connections.keys()):
+                self.close_connection(connection_name)
+
+    def _schedule_cleanup(self) -> None:
+        """Start the idle cleanup timer if it is not already running."""
+        if self._cleanup_timer is not None or not self.connections:
+            return
+
+        self._cleanup_timer = threading.Timer(
+            max(self.max_idle_time / 2, 1), self._run_cleanup
+        )
+        self._cleanup_timer.daemon = True
+        self._cleanup_timer.start()
+
+    def _run_cleanup(self) -> None:
+        """Close idle connections and reschedule while any remain open."""
+        with self._lock:
+            self._cleanup_timer = None
+            self._cleanup_connections(max_idle_time=self.max_idle_time)
+            self._schedule_cleanup()
 
     def _cleanup_connections(self, max_idle_time: int = 300) -> None:
         """
@@ -221,7 +651,8 @@ class SSHConnectionManager:
         Args:
             max_idle_time: Maximum idle time in seconds before a connection is closed.
         """
-        current_time = time.time()
-        for connection_name in list(self.last_used.keys()):
-            if current_time - self.last_used[connection_name] > max_idle_time:
-                self.close_connection(connection_name)
+        with self._lock:
+            current_time = time.monotonic()
+            for connection_name in list(self.last_used.keys()):
+                if current_time - self.last_used[connection_name] > max_idle_time:
+                    self.close_connection(connection_name)
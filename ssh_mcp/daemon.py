@@ -0,0 +1,282 @@
+"""
+Connection daemon for SSH-MCP.
+
+This module provides a local daemon that keeps SSH connections open between CLI
+invocations, so repeated `ssh-mcp run --persistent` calls skip the SSH handshake.
+"""
+
+import fcntl
+import hashlib
+import json
+import os
+import socket
+import subprocess
+import sys
+import time
+from typing import Any, Dict, Optional
+
+from .config import ConfigurationManager
+from .connection import SSHConnectionManager
+from .executor import CommandExecutionError, CommandExecutor
+
+# Directory holding the daemon sockets, one per configuration path.
+_RUNTIME_DIR = os.path.join(
+    os.environ.get("XDG_RUNTIME_DIR")
+    or os.environ.get("XDG_CACHE_HOME")
+    or os.path.expanduser("~/.cache"),
+    "ssh-mcp",
+)
+
+# Seconds allowed on top of the command timeout for the daemon to connect and
+# reply before the client gives up on it.
+_RESPONSE_GRACE = 30.0
+
+# Seconds the daemon waits for a connected client to send its request.
+_REQUEST_TIMEOUT = 5.0
+
+
+def socket_path(config_path: str) -> str:
+    """
+    Get the path of the daemon socket for a configuration file.
+
+    Args:
+        config_path: Path to the configuration file.
+
+    Returns:
+        Path to the unix socket.
+    """
+    digest = hashlib.sha256(os.path.abspath(config_path).encode("utf-8")).hexdigest()
+    return os.path.join(_RUNTIME_DIR, f"{digest[:16]}.sock")
+
+
+class ConnectionDaemon:
+    """Serves command requests over a unix socket using long-lived SSH connections."""
+
+    def __init__(
+        self,
+        config_path: str,
+        idle_timeout: int = 600,
+        max_idle_time: int = 300,
+        poll_interval: float = 30.0,
+    ):
+        """
+        Initialize the connection daemon.
+
+        Args:
+            config_path: Path to the configuration file.
+            idle_timeout: Seconds without requests after which the daemon exits.
+            max_idle_time: Seconds after which an unused SSH connection is closed.
+            poll_interval: Seconds between idle checks while waiting for requests.
+        """
+        self.config_path = config_path
+        self.idle_timeout = idle_timeout
+        self.max_idle_time = max_idle_time
+        self.poll_interval = poll_interval
+        self.socket_path = socket_path(config_path)
+        self.config_manager = ConfigurationManager(config_path)
+        self.executor = CommandExecutor(
+            config_manager=self.config_manager,
+            connection_manager=SSHConnectionManager(
+                self.config_manager, max_idle_time=max_idle_time
+            ),
+        )
+        self.running = False
+
+    def serve(self) -> None:
+        """
+        Accept and handle requests until the daemon is idle or stopped.
+
+        Requests are handled one at a time, so the connection manager is never
+        used from more than one thread. If another daemon is already serving
+        the same configuration, this returns without serving.
+        """
+        os.makedirs(_RUNTIME_DIR, mode=0o700, exist_ok=True)
+
+        # Only one daemon serves each configuration. The lock is held for as
+        # long as this daemon serves, so any socket left behind is stale.
+        lock_fd = os.open(f"{self.socket_path}.lock", os.O_WRONLY | os.O_CREAT, 0o600)
+        try:
+            try:
+                fcntl.flock(lock_fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                return
+
+            self._serve()
+        finally:
+            os.close(lock_fd)
+
+    def _serve(self) -> None:
+        """Serve requests while holding the daemon lock."""
+        if os.path.exists(self.socket_path):
+            os.unlink(self.socket_path)
+
+        server_socket = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            # Create the socket owner-only from the start, so other local
+            # users cannot connect before its mode is tightened
+            old_umask = os.umask(0o077)
+            try:
+                server_socket.bind(self.socket_path)
+            finally:
+                os.umask(old_umask)
+            server_socket.listen(5)
+            server_socket.settimeout(self.poll_interval)
+
+            self.running = True
+            last_request = time.monotonic()
+
+            while self.running:
+                try:
+                    client_socket, _ = server_socket.accept()
+                except socket.timeout:
+                    client_socket = None
+
+                if client_socket is not None:
+                    # A client that never sends its request must not stall
+                    # the daemon, which serves one client at a time
+                    client_socket.settimeout(_REQUEST_TIMEOUT)
+                    with client_socket:
+                        self._handle_client(client_socket)
+                    last_request = time.monotonic()
+
+                if time.monotonic() - last_request > self.idle_timeout:
+                    break
+
+        finally:
+            self.running = False
+            self.executor.connection_manager.close_all_connections()
+            server_socket.close()
+            if os.path.exists(self.socket_path):
+                os.unlink(self.socket_path)
+
+    def stop(self) -> None:
+        """Stop serving after the current poll interval."""
+        self.running = False
+
+    def _handle_client(self, client_socket: socket.socket) -> None:
+        """
+        Handle a single request.
+
+        Args:
+            client_socket: The connected client socket.
+        """
+        try:
+            with client_socket.makefile("rb") as f:
+                request = json.loads(f.readline())
+
+            response = self.executor.execute_command(
+                request["connection"],
+                request["command"],
+                timeout=request.get("timeout"),
+            )
+        except CommandExecutionError as e:
+            response = {"exception": str(e)}
+        except socket.timeout:
+            response = {"exception": "Invalid request: timed out reading request"}
+        except Exception as e:
+            response = {"exception": f"Invalid request: {str(e)}"}
+
+        try:
+            client_socket.sendall(json.dumps(response).encode("utf-8") + b"\n")
+        except OSError:
+            pass
+
+
+def _connect(path: str) -> Optional[socket.socket]:
+    """
+    Connect to a daemon socket.
+
+    Args:
+        path: Path to the unix socket.
+
+    Returns:
+        The connected socket, or None if no daemon is listening.
+    """
+    client_socket = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        client_socket.connect(path)
+        return client_socket
+    except OSError:
+        client_socket.close()
+        return None
+
+
+def _start_daemon(config_path: str) -> None:
+    """
+    Start a detached daemon process for a configuration file.
+
+    Args:
+        config_path: Path to the configuration file.
+    """
+    subprocess.Popen(
+        [sys.executable, "-m", "ssh_mcp.cli", "--config", config_path, "daemon"],
+        stdin=subprocess.DEVNULL,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+        start_new_session=True,
+    )
+
+
+def execute_command(
+    config_path: str,
+    connection_name: str,
+    command: str,
+    timeout: Optional[int] = None,
+    start_timeout: float = 10.0,
+) -> Dict[str, Any]:
+    """
+    Execute a command through the daemon, starting it if it is not running.
+
+    Args:
+        config_path: Path to the configuration file.
+        connection_name: The name of the connection from the configuration.
+        command: The command to execute.
+        timeout: Optional timeout for the command execution in seconds.
+        start_timeout: Seconds to wait for a newly started daemon to listen.
+
+    Returns:
+        Dict containing the command execution results, as returned by
+        CommandExecutor.execute_command.
+
+    Raises:
+        CommandExecutionError: If the command is not allowed or the daemon
+                               cannot be reached or does not reply in time.
+    """
+    if timeout is None:
+        timeout = ConfigurationManager(config_path).get_timeout()
+
+    path = socket_path(config_path)
+    client_socket = _connect(path)
+
+    if client_socket is None:
+        _start_daemon(config_path)
+        deadline = time.monotonic() + start_timeout
+        while client_socket is None and time.monotonic() < deadline:
+            time.sleep(0.05)
+            client_socket = _connect(path)
+
+    if client_socket is None:
+        raise CommandExecutionError("Could not connect to the SSH-MCP daemon")
+
+    with client_socket:
+        client_socket.settimeout(timeout + _RESPONSE_GRACE)
+        request = {
+            "connection": connection_name,
+            "command": command,
+            "timeout": timeout,
+        }
+        try:
+            client_socket.sendall(json.dumps(request).encode("utf-8") + b"\n")
+            with client_socket.makefile("rb") as f:
+                line = f.readline()
+        except socket.timeout:
+            raise CommandExecutionError("Timed out waiting for the SSH-MCP daemon")
+
+    if not line:
+        raise CommandExecutionError("The SSH-MCP daemon closed the connection")
+
+    response = json.loads(line)
+    if "exception" in response:
+        raise CommandExecutionError(response["exception"])
+
+    return response
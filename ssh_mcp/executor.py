@@ -11,6 +11,12 @@ from typing import Any, Dict, List, Optional, Tuple
 from .config import ConfigurationManager
 from .connection import SSHConnectionError, SSHConnectionManager
 
+# Quoting/escape characters that need full shell-style parsing.
+_SHELL_QUOTE_RE = re.compile(r"[\"'\\]")
+
+# First word of a command, split on the same whitespace as shlex.
+_FIRST_WORD_RE = re.compile(r"[^ \t\r\n]+")
+
 
 class CommandExecutionError(Exception):
     """Exception raised for command execution errors."""
@@ -40,10 +46,15 @@ class CommandExecutor:
             self.config_manager
         )
         self.allowed_commands = self.config_manager.get_allowed_commands()
+        self._allowed_set = frozenset(self.allowed_commands)
         self.max_output_size = self.config_manager.get_max_output_size()
 
     def execute_command(
-        self, connection_name: str, command: str, timeout: Optional[int] = None
+        self,
+        connection_name: str,
+        command: str,
+        timeout: Optional[int] = None,
+        binary: bool = False,
     ) -> Dict[str, Any]:
         """
         Execute a command on a remote server.
@@ -53,13 +64,14 @@ class CommandExecutor:
             command: The command to execute.
             timeout: Optional timeout for the command execution in seconds.
                     If not provided, the default timeout from the configuration is used.
+            binary: If True, stdout and stderr are returned as undecoded bytes.
 
         Returns:
             Dict containing the command execution results:
             {
                 "exit_code": int,
-                "stdout": str,
-                "stderr": str,
+                "stdout": str (bytes if binary),
+                "stderr": str (bytes if binary),
                 "success": bool,
                 "error": Optional[str]
             }
@@ -76,17 +88,17 @@ class CommandExecutor:
             # Get the connection
             connection = self.connection_manager.get_connection(connection_name)
 
-            # Execute the command
-            exit_code, stdout, stderr = connection.execute_command(
-                command, timeout=timeout or self.config_manager.get_timeout()
+            # Execute the command, keeping at most max_output_size bytes of output
+            execute = (
+                connection.execute_command_bytes
+                if binary
+                else connection.execute_command
+            )
+            exit_code, stdout, stderr = execute(
+                command,
+                timeout=timeout or self.config_manager.get_timeout(),
+                max_output_size=self.max_output_size,
             )
-
-            # Truncate output if it exceeds the maximum size
-            if len(stdout) > self.max_output_size:
-                stdout = stdout[: self.max_output_size] + "\n... (output truncated)"
-
-            if len(stderr) > self.max_output_size:
-                stderr = stderr[: self.max_output_size] + "\n... (output truncated)"
 
             return {
                 "exit_code": exit_code,
@@ -99,8 +111,8 @@ class CommandExecutor:
         except SSHConnectionError as e:
             return {
                 "exit_code": -1,
-                "stdout": "",
-                "stderr": "",
+                "stdout": b"" if binary else "",
+                "stderr": b"" if binary else "",
                 "success": False,
                 "error": str(e),
             }
@@ -108,12 +120,70 @@ class CommandExecutor:
         except Exception as e:
             return {
                 "exit_code": -1,
-                "stdout": "",
-                "stderr": "",
+                "stdout": b"" if binary else "",
+                "stderr": b"" if binary else "",
                 "success": False,
                 "error": f"Command execution failed: {str(e)}",
             }
 
+    def execute_commands(
+        self, connection_name: str, commands: List[str], timeout: Optional[int] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Execute several commands in order on a remote server over a single channel.
+
+        Args:
+            connection_name: The name of the connection from the configuration.
+            commands: The commands to execute.
+            timeout: Optional timeout for each command's execution in seconds.
+                    If not provided, the default timeout from the configuration is used.
+
+        Returns:
+            List with one dict per command, in the format returned by execute_command.
+
+        Raises:
+            CommandExecutionError: If any of the commands is not allowed. No command
+                                   is executed in that case.
+        """
+        self.config_manager.reload_config()
+
+        # Validate every command before running any of them
+        for command in commands:
+            self._validate_command(command)
+
+        if not commands:
+            return []
+
+        try:
+            connection = self.connection_manager.get_connection(connection_name)
+            results = connection.execute_commands(
+                commands,
+                timeout=timeout or self.config_manager.get_timeout(),
+                max_output_size=self.max_output_size,
+            )
+            error = None
+
+        except SSHConnectionError as e:
+            results = [(-1, "", "")] * len(commands)
+            error = str(e)
+
+        except Exception as e:
+            results = [(-1, "", "")] * len(commands)
+            error = f"Command execution failed: {str(e)}"
+
+        return [
+            {
+                "exit_code": exit_code,
+                "stdout": stdout,
+                "stderr": stderr,
+                "success": exit_code == 0,
+                "error": (
+                    (error or "Command did not complete") if exit_code == -1 else None
+                ),
+            }
+            for exit_code, stdout, stderr in results
+        ]
+
     def _validate_command(self, command: str) -> None:
         """
         Validate that a command is allowed to be executed.
@@ -124,9 +194,15 @@ class CommandExecutor:
         Raises:
             CommandExecutionError: If the command is not allowed.
         """
-        # Parse the command to get the base command
+        # Parse the command to get the base command. Only commands with quotes
+        # or escapes need shlex; otherwise the first word is the base command.
         try:
-            args = shlex.split(command)
+            if _SHELL_QUOTE_RE.search(command):
+                args = shlex.split(command)
+            else:
+                match = _FIRST_WORD_RE.search(command)
+                args = [match.group(0)] if match else []
+
             if not args:
                 raise CommandExecutionError("Empty command")
 
@@ -135,7 +211,7 @@ class CommandExecutor:
             raise CommandExecutionError(f"Invalid command format: {str(e)}")
 
         # Check if the base command is in the allowed list
-        if base_command not in self.allowed_commands:
+        if base_command not in self._allowed_set:
             raise CommandExecutionError(
                 f"Command '{base_command}' is not allowed. "
                 f"Allowed commands are: {', '.join(self.allowed_commands)}"
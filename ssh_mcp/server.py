@@ -17,7 +17,10 @@ class SSHMCPServer:
     """MCP server for executing commands on remote servers via SSH."""
 
     def __init__(
-        self, server_name: str = "SSH-MCP Server", config_path: Optional[str] = None
+        self,
+        server_name: str = "SSH-MCP Server",
+        config_path: Optional[str] = None,
+        config_manager: Optional[ConfigurationManager] = None,
     ):
         """
         Initialize the MCP server.
@@ -26,14 +29,20 @@ class SSHMCPServer:
             server_name: The name of the MCP server.
             config_path: Optional path to the configuration file.
                         If not provided, the default ~/.ssh-mcp-config.yaml is used.
+            config_manager: Optional configuration manager to use instead of
+                            loading config_path.
         """
         self.server_name = server_name
-        self.config_manager = ConfigurationManager(config_path)
+        self.config_manager = config_manager or ConfigurationManager(config_path)
         self.connection_manager = SSHConnectionManager(self.config_manager)
         self.command_executor = CommandExecutor(
             self.connection_manager, self.config_manager
         )
 
+        # Sanitized configuration, rebuilt when the configuration version changes
+        self._sanitized_config_cache: Optional[Dict[str, Any]] = None
+        self._sanitized_config_version = -1
+
         # Create the MCP server
         self.mcp = FastMCP(server_name)
 
@@ -72,20 +81,24 @@ class SSHMCPServer:
             Returns:
                 Dictionary containing server configuration.
             """
-            # Create a sanitized version of the configuration
-            sanitized_config = {
-                "connections": {},
-                "defaults": self.config_manager.config.get("defaults", {}),
+            self.config_manager.reload_config()
+            if self._sanitized_config_version == self.config_manager.version:
+                return self._sanitized_config_cache
+
+            # Create a sanitized version of the configuration, without passwords
+            config = self.config_manager.config
+            self._sanitized_config_cache = {
+                "connections": {
+                    name: (
+                        {**conn, "password": "********"} if "password" in conn else conn
+                    )
+                    for name, conn in config.get("connections", {}).items()
+                },
+                "defaults": config.get("defaults", {}),
             }
+            self._sanitized_config_version = self.config_manager.version
 
-            # Add connection information without passwords
-            for name, conn in self.config_manager.config.get("connections", {}).items():
-                sanitized_conn = conn.copy()
-                if "password" in sanitized_conn:
-                    sanitized_conn["password"] = "********"
-                sanitized_config["connections"][name] = sanitized_conn
-
-            return sanitized_config
+            return self._sanitized_config_cache
 
     def _register_tools(self) -> None:
         """Register MCP tools."""
@@ -111,6 +124,23 @@ class SSHMCPServer:
             """
             return self.command_executor.execute_command(connection, command)
 
+        @self.mcp.tool()
+        def execute_commands(
+            connection: str, commands: List[str]
+        ) -> List[Dict[str, Any]]:
+            """
+            Execute several commands in order on a remote server in one call.
+
+            Args:
+                connection: The name of the connection to use.
+                commands: The commands to execute.
+
+            Returns:
+                List with one result per command, each in the format returned by
+                execute_command.
+            """
+            return self.command_executor.execute_commands(connection, commands)
+
         @self.mcp.tool()
         def list_connections() -> List[str]:
             """
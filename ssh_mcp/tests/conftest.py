@@ -0,0 +1,77 @@
+"""
+Shared fixtures for the SSH-MCP tests.
+"""
+
+import os
+import tempfile
+
+import pytest
+import yaml
+
+from ssh_mcp import config as config_module
+from ssh_mcp.config import ConfigurationManager
+from ssh_mcp.tests.mock_ssh_server import MockSSHServer
+
+# Use the libyaml-backed dumper when available
+YAML_DUMPER = getattr(yaml, "CSafeDumper", yaml.SafeDumper)
+
+
+@pytest.fixture(scope="session", autouse=True)
+def config_cache_dir(tmp_path_factory):
+    """Fixture keeping the parsed-config cache out of the user's cache directory."""
+    cache_dir = tmp_path_factory.mktemp("config-cache")
+    with pytest.MonkeyPatch.context() as mp:
+        mp.setattr(config_module, "_CACHE_DIR", str(cache_dir))
+        yield cache_dir
+
+
+@pytest.fixture(scope="session")
+def mock_ssh_server():
+    """Fixture providing a mock SSH server shared by all test modules."""
+    # Start the mock SSH server
+    server = MockSSHServer(port=0)
+    server.start()
+
+    # Wait for the server to start
+    assert server.ready.wait(timeout=2.0)
+
+    yield server
+
+    # Stop the server
+    server.stop()
+
+
+@pytest.fixture(scope="session")
+def config_file(mock_ssh_server):
+    """Fixture creating a configuration file for the mock SSH server."""
+    config = {
+        "connections": {
+            "test-server": {
+                "hostname": "127.0.0.1",
+                "port": mock_ssh_server.port,
+                "username": "testuser",
+                "auth_method": "password",
+                "password": "testpass",
+            }
+        },
+        "defaults": {
+            "timeout": 5,
+            "max_output_size": 1024,
+            "allowed_commands": ["ls", "cat", "echo", "pwd", "whoami"],
+        },
+    }
+
+    fd, temp_path = tempfile.mkstemp(suffix=".yaml")
+    os.write(fd, yaml.dump(config, Dumper=YAML_DUMPER).encode("utf-8"))
+    os.close(fd)
+
+    yield temp_path
+
+    # Clean up the temporary file
+    os.unlink(temp_path)
+
+
+@pytest.fixture(scope="session")
+def config_manager(config_file):
+    """Fixture providing a configuration manager shared by all test modules."""
+    return ConfigurationManager(config_file)
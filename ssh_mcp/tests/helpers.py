@@ -0,0 +1,12 @@
+"""
+Shared assertions for the SSH-MCP tests.
+"""
+
+# Keys every command execution result must contain
+_RESULT_KEYS = frozenset(("success", "exit_code", "stdout", "stderr"))
+
+
+def assert_result_shape(result):
+    """Assert that a command execution result has the expected keys."""
+    assert isinstance(result, dict)
+    assert _RESULT_KEYS <= result.keys()
@@ -5,13 +5,45 @@ This module provides a mock SSH server for testing SSH connections without a rea
 """
 
 import os
+import queue
+import selectors
 import socket
 import threading
 import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
 from typing import Any, Callable, Dict, List, Optional, Tuple
 
 import paramiko
 
+# Canned command output
+_LS_LA_OUT = (
+    "total 20\n"
+    "drwxr-xr-x 2 user user 4096 Jun  7 12:34 .\n"
+    "drwxr-xr-x 6 user user 4096 Jun  7 12:30 ..\n"
+    "-rw-r--r-- 1 user user  123 Jun  7 12:32 file1.txt\n"
+    "-rw-r--r-- 1 user user  456 Jun  7 12:33 file2.txt\n"
+)
+_LS_OUT = "file1.txt\nfile2.txt\n"
+_CAT_OUTPUTS: Dict[str, Tuple[int, str, str]] = {
+    "file1.txt": (0, "This is the content of file1.txt\n", ""),
+    "file2.txt": (0, "This is the content of file2.txt\nIt has multiple lines.\n", ""),
+}
+
+
+@lru_cache(maxsize=1)
+def _get_test_host_key() -> paramiko.RSAKey:
+    """
+    Get the host key shared by mock servers that are not given one.
+
+    Generating an RSA key is slow and a mock server's key need not be unique,
+    so it is generated once per process.
+
+    Returns:
+        The host key.
+    """
+    return paramiko.RSAKey.generate(2048)
+
 
 class MockSSHServer:
     """
@@ -28,6 +60,7 @@ class MockSSHServer:
         username: str = "testuser",
         password: Optional[str] = "testpass",
         key_path: Optional[str] = None,
+        max_clients: int = 8,
     ):
         """
         Initialize the mock SSH server.
@@ -38,18 +71,20 @@ class MockSSHServer:
             username: The username to accept for authentication.
             password: The password to accept for authentication.
             key_path: Path to a private key to use for server host key.
+            max_clients: Maximum number of client connections served at once.
         """
         self.host = host
         self.port = port
         self.username = username
         self.password = password
         self.key_path = key_path
+        self.max_clients = max_clients
 
         # Generate a server key if not provided
         if key_path and os.path.exists(key_path):
             self.server_key = paramiko.RSAKey(filename=key_path)
         else:
-            self.server_key = paramiko.RSAKey.generate(2048)
+            self.server_key = _get_test_host_key()
 
         # Command handlers
         self.command_handlers: Dict[str, Callable] = {
@@ -63,8 +98,12 @@ class MockSSHServer:
         # Server state
         self.server_socket = None
         self.server_thread = None
+        self.client_pool: Optional[ThreadPoolExecutor] = None
         self.running = False
 
+        # Set once the server is accepting connections
+        self.ready = threading.Event()
+
     def start(self) -> None:
         """
         Start the mock SSH server.
@@ -80,16 +119,22 @@ class MockSSHServer:
             self.server_socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
             self.server_socket.bind((self.host, self.port))
             self.server_socket.listen(5)
+            self.server_socket.setblocking(False)
 
             # Get the actual port if we used 0
             self.port = self.server_socket.getsockname()[1]
 
             # Start the server thread
             self.running = True
+            self.client_pool = ThreadPoolExecutor(max_workers=self.max_clients)
             self.server_thread = threading.Thread(target=self._run_server)
             self.server_thread.daemon = True
             self.server_thread.start()
 
+            # The socket is already listening, so connections queue up even
+            # before the server thread gets to accept them
+            self.ready.set()
+
             print(f"Mock SSH server started on {self.host}:{self.port}")
 
         except Exception as e:
@@ -103,43 +148,54 @@ class MockSSHServer:
         Stop the mock SSH server.
         """
         self.running = False
+        self.ready.clear()
         if self.server_socket:
             self.server_socket.close()
 
         if self.server_thread and self.server_thread.is_alive():
             self.server_thread.join(timeout=1.0)
 
+        if self.client_pool:
+            self.client_pool.shutdown(wait=False)
+
         print("Mock SSH server stopped")
 
     def _run_server(self) -> None:
         """
         Run the server loop.
 
-        This method runs in a separate thread and accepts connections.
+        This method runs in a separate thread and accepts connections,
+        handing each one to the client pool.
         """
+        selector = selectors.DefaultSelector()
+
         try:
+            selector.register(self.server_socket, selectors.EVENT_READ)
+
             while self.running:
+                # Wake up regularly to notice when the server is stopped
+                if not selector.select(timeout=0.5):
+                    continue
+
                 try:
                     client_socket, client_address = self.server_socket.accept()
-                    print(f"Connection from {client_address[0]}:{client_address[1]}")
-
-                    # Handle the connection in a new thread
-                    client_thread = threading.Thread(
-                        target=self._handle_client, args=(client_socket,)
-                    )
-                    client_thread.daemon = True
-                    client_thread.start()
-
+                except BlockingIOError:
+                    continue
                 except (socket.error, OSError):
                     if not self.running:
                         break
                     raise
 
+                print(f"Connection from {client_address[0]}:{client_address[1]}")
+                client_socket.setblocking(True)
+                self.client_pool.submit(self._handle_client, client_socket)
+
         except Exception as e:
             if self.running:
                 print(f"Server error: {str(e)}")
 
         finally:
+            selector.close()
             if self.server_socket:
                 self.server_socket.close()
 
@@ -151,6 +207,7 @@ class MockSSHServer:
             client_socket: The client socket.
         """
         transport = None
+        server_handler = None
 
         try:
             # Set up the transport
@@ -164,38 +221,31 @@ class MockSSHServer:
             # Start the server
             transport.start_server(server=server_handler)
 
+            # A single worker runs the session's commands in order
+            threading.Thread(target=server_handler.run_commands, daemon=True).start()
+
             # Wait for channels and handle them
-            while transport.is_active():
+            while transport.is_active() and self.running:
                 channel = transport.accept(1)
                 if channel is None:
                     continue
 
                 # Handle the channel in the server handler
                 server_handler.handle_session(channel)
-                break
 
         except Exception as e:
             print(f"Error handling client: {str(e)}")
 
         finally:
+            if server_handler:
+                server_handler.commands.put(None)
             if transport:
                 transport.close()
 
     # Command handlers
     def _handle_ls(self, args: List[str]) -> Tuple[int, str, str]:
         """Handle ls command."""
-        if "-la" in args:
-            output = (
-                "total 20\n"
-                "drwxr-xr-x 2 user user 4096 Jun  7 12:34 .\n"
-                "drwxr-xr-x 6 user user 4096 Jun  7 12:30 ..\n"
-                "-rw-r--r-- 1 user user  123 Jun  7 12:32 file1.txt\n"
-                "-rw-r--r-- 1 user user  456 Jun  7 12:33 file2.txt\n"
-            )
-        else:
-            output = "file1.txt\nfile2.txt\n"
-
-        return 0, output, ""
+        return 0, _LS_LA_OUT if "-la" in args else _LS_OUT, ""
 
     def _handle_cat(self, args: List[str]) -> Tuple[int, str, str]:
         """Handle cat command."""
@@ -203,13 +253,10 @@ class MockSSHServer:
             return 1, "", "cat: missing operand"
 
         filename = args[0]
-
-        if filename == "file1.txt":
-            return 0, "This is the content of file1.txt\n", ""
-        elif filename == "file2.txt":
-            return 0, "This is the content of file2.txt\nIt has multiple lines.\n", ""
-        else:
+        result = _CAT_OUTPUTS.get(filename)
+        if result is None:
             return 1, "", f"cat: {filename}: No such file or directory"
+        return result
 
     def _handle_echo(self, args: List[str]) -> Tuple[int, str, str]:
         """Handle echo command."""
@@ -242,6 +289,15 @@ class MockSSHServerHandler(paramiko.ServerInterface):
         self.command_handlers = {}
         self.channel = None
 
+        # Exec requests waiting for the session's command worker
+        self.commands: "queue.Queue[Optional[Tuple[paramiko.Channel, str]]]" = (
+            queue.Queue()
+        )
+
+        # Set when the command on a channel has finished, keyed by channel ID
+        self._command_done: Dict[int, threading.Event] = {}
+        self._command_done_lock = threading.Lock()
+
     def check_channel_request(self, kind: str, chanid: int) -> int:
         """
         Check if a channel request is acceptable.
@@ -328,31 +384,52 @@ class MockSSHServerHandler(paramiko.ServerInterface):
         Returns:
             True if the request is acceptable, False otherwise.
         """
-        # Accept the exec request and handle the command in a separate thread
-        # to avoid blocking
-        threading.Thread(
-            target=self._handle_command,
-            args=(channel, command.decode("utf-8")),
-            daemon=True,
-        ).start()
+        # Accept the exec request and leave the command to the session's
+        # worker, so the transport thread is not blocked
+        self.commands.put((channel, command.decode("utf-8")))
         return True
 
-    def handle_session(self, channel: paramiko.Channel) -> None:
+    def run_commands(self) -> None:
+        """
+        Run queued commands until a None sentinel is received.
+        """
+        while True:
+            item = self.commands.get()
+            if item is None:
+                break
+            self._handle_command(*item)
+
+    def _done_event(self, channel: paramiko.Channel) -> threading.Event:
+        """
+        Get the event signalled when the command on a channel has finished.
+
+        Args:
+            channel: The channel.
+
+        Returns:
+            The channel's event.
+        """
+        with self._command_done_lock:
+            return self._command_done.setdefault(channel.get_id(), threading.Event())
+
+    def handle_session(self, channel: paramiko.Channel, timeout: float = 30) -> None:
         """
         Handle a session.
 
         Args:
             channel: The channel.
+            timeout: Seconds to wait for the channel's command to finish.
         """
-        # Wait for the command to complete or channel to close
+        # Wait for the command to complete. A finished channel is left for
+        # the client to close; one that never ran a command is closed here.
         try:
-            while channel.active and not channel.closed:
-                time.sleep(0.1)
-        except Exception:
-            pass
+            finished = self._done_event(channel).wait(timeout=timeout)
         finally:
-            if channel.active and not channel.closed:
-                channel.close()
+            with self._command_done_lock:
+                self._command_done.pop(channel.get_id(), None)
+
+        if not finished and channel.active and not channel.closed:
+            channel.close()
 
     def _handle_command(self, channel: paramiko.Channel, command: str) -> None:
         """
@@ -363,47 +440,51 @@ class MockSSHServerHandler(paramiko.ServerInterface):
             command: The command to execute.
         """
         try:
-            # Parse the command
-            parts = command.strip().split()
-            if not parts:
+            # Parse the command, splitting the arguments only if there are any
+            base_command, sep, rest = command.strip().partition(" ")
+            if not base_command:
                 exit_code = 1
                 stdout = ""
                 stderr = "Empty command"
             else:
-                base_command = parts[0]
-                args = parts[1:]
+                args = rest.split() if sep else []
 
                 # Check if we have a handler for this command
-                if base_command in self.command_handlers:
-                    exit_code, stdout, stderr = self.command_handlers[base_command](
-                        args
-                    )
+                handler = self.command_handlers.get(base_command)
+                if handler is not None:
+                    exit_code, stdout, stderr = handler(args)
                 else:
                     exit_code = 127
                     stdout = ""
                     stderr = f"Command not found: {base_command}"
 
-            # Send the output
+            # Send the output. send() may write only part of a large output,
+            # sendall() keeps going until all of it has been sent.
             if stdout:
-                channel.send(stdout.encode("utf-8"))
+                channel.sendall(stdout.encode("utf-8"))
             if stderr:
-                channel.send_stderr(stderr.encode("utf-8"))
+                channel.sendall_stderr(stderr.encode("utf-8"))
 
-            # Set the exit code and close
+            # Set the exit code and signal EOF. The client closes the channel
+            # once it has the exit code; closing it here could overtake the
+            # reply to the exec request and fail the client's exec_command().
             channel.send_exit_status(exit_code)
-            channel.close()
+            channel.shutdown_write()
 
         except Exception as e:
             # Handle any errors
             try:
-                channel.send_stderr(
+                channel.sendall_stderr(
                     f"Error executing command: {str(e)}\n".encode("utf-8")
                 )
                 channel.send_exit_status(1)
-                channel.close()
+                channel.shutdown_write()
             except Exception:
                 pass
 
+        finally:
+            self._done_event(channel).set()
+
 
 def main():
     """Run a mock SSH server for testing."""
@@ -413,8 +494,6 @@ def main():
     try:
         print("Mock SSH server running. Press Ctrl+C to stop.")
         while True:
-            import time
-
             time.sleep(1)
 
     except KeyboardInterrupt:
@@ -2,49 +2,63 @@
 Tests for the configuration manager.
 """
 
+import copy
+import hashlib
 import os
 import tempfile
-from pathlib import Path
+from collections import OrderedDict
 
 import pytest
 import yaml
 
+from ssh_mcp import config as config_module
 from ssh_mcp.config import ConfigurationManager
 
+# Use the libyaml-backed dumper when available
+YAML_DUMPER = getattr(yaml, "CSafeDumper", yaml.SafeDumper)
+
+SAMPLE_CONFIG = {
+    "connections": {
+        "test-server": {
+            "hostname": "test.example.com",
+            "port": 2222,
+            "username": "testuser",
+            "auth_method": "key",
+            "key_path": "~/.ssh/id_test",
+        },
+        "password-server": {
+            "hostname": "password.example.com",
+            "username": "passuser",
+            "auth_method": "password",
+            "password": "testpassword",
+        },
+    },
+    "defaults": {
+        "timeout": 45,
+        "max_output_size": 2048,
+        "allowed_commands": ["ls", "cat", "echo"],
+    },
+}
+
+
+def _file_digest(path):
+    """Get the SHA-256 hex digest of a file's content."""
+    with open(path, "rb") as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
 
 @pytest.fixture
 def sample_config():
     """Fixture providing a sample configuration dictionary."""
-    return {
-        "connections": {
-            "test-server": {
-                "hostname": "test.example.com",
-                "port": 2222,
-                "username": "testuser",
-                "auth_method": "key",
-                "key_path": "~/.ssh/id_test",
-            },
-            "password-server": {
-                "hostname": "password.example.com",
-                "username": "passuser",
-                "auth_method": "password",
-                "password": "testpassword",
-            },
-        },
-        "defaults": {
-            "timeout": 45,
-            "max_output_size": 2048,
-            "allowed_commands": ["ls", "cat", "echo"],
-        },
-    }
+    return copy.deepcopy(SAMPLE_CONFIG)
 
 
 @pytest.fixture
 def config_file(sample_config):
     """Fixture creating a temporary configuration file."""
-    with tempfile.NamedTemporaryFile(mode="w", delete=False, suffix=".yaml") as f:
-        yaml.dump(sample_config, f)
-        temp_path = f.name
+    fd, temp_path = tempfile.mkstemp(suffix=".yaml")
+    os.write(fd, yaml.dump(sample_config, Dumper=YAML_DUMPER).encode("utf-8"))
+    os.close(fd)
 
     yield temp_path
 
@@ -52,46 +66,271 @@ def config_file(sample_config):
     os.unlink(temp_path)
 
 
-def test_load_config(config_file, sample_config):
-    """Test loading configuration from a file."""
-    config_manager = ConfigurationManager(config_file)
+@pytest.fixture(scope="session")
+def sample_config_manager(tmp_path_factory):
+    """Fixture providing a configuration manager shared by read-only tests."""
+    config_path = tmp_path_factory.mktemp("config") / "config.yaml"
+    with open(config_path, "w") as f:
+        yaml.dump(SAMPLE_CONFIG, f, Dumper=YAML_DUMPER)
+
+    return ConfigurationManager(str(config_path))
+
 
+def test_load_config(sample_config_manager):
+    """Test loading configuration from a file."""
     # Test that the configuration was loaded correctly
-    assert "connections" in config_manager.config
-    assert "test-server" in config_manager.config["connections"]
-    assert "password-server" in config_manager.config["connections"]
+    assert "connections" in sample_config_manager.config
+    assert "test-server" in sample_config_manager.config["connections"]
+    assert "password-server" in sample_config_manager.config["connections"]
 
     # Test connection details
-    test_server = config_manager.get_connection_config("test-server")
+    test_server = sample_config_manager.get_connection_config("test-server")
     assert test_server["hostname"] == "test.example.com"
     assert test_server["port"] == 2222
     assert test_server["username"] == "testuser"
     assert test_server["auth_method"] == "key"
 
     # Test defaults
-    assert config_manager.get_timeout() == 45
-    assert config_manager.get_max_output_size() == 2048
-    assert "ls" in config_manager.get_allowed_commands()
-    assert "cat" in config_manager.get_allowed_commands()
-    assert "echo" in config_manager.get_allowed_commands()
+    assert sample_config_manager.get_timeout() == 45
+    assert sample_config_manager.get_max_output_size() == 2048
+    assert "ls" in sample_config_manager.get_allowed_commands()
+    assert "cat" in sample_config_manager.get_allowed_commands()
+    assert "echo" in sample_config_manager.get_allowed_commands()
 
 
-def test_get_connection_names(config_file):
+def test_get_connection_names(sample_config_manager):
     """Test getting connection names."""
-    config_manager = ConfigurationManager(config_file)
-    names = config_manager.get_connection_names()
+    names = sample_config_manager.get_connection_names()
 
     assert "test-server" in names
     assert "password-server" in names
     assert len(names) == 2
 
 
-def test_nonexistent_connection(config_file):
+def test_nonexistent_connection(sample_config_manager):
     """Test getting a nonexistent connection."""
+    with pytest.raises(ValueError):
+        sample_config_manager.get_connection_config("nonexistent-server")
+
+
+def test_connection_defaults(sample_config_manager):
+    """Test that optional connection fields get their defaults."""
+    password_server = sample_config_manager.get_connection_config("password-server")
+    assert password_server["port"] == 22
+    assert "key_path" not in password_server
+
+
+@pytest.mark.parametrize(
+    ("connection", "message"),
+    [
+        ({"username": "user"}, "missing required field 'hostname'"),
+        ({"hostname": "host"}, "missing required field 'username'"),
+        (
+            {"hostname": "host", "username": "user", "auth_method": "token"},
+            "invalid auth_method 'token'",
+        ),
+        (
+            {"hostname": "host", "username": "user", "auth_method": "password"},
+            "missing required field 'password'",
+        ),
+    ],
+)
+def test_invalid_connection_config(connection, message):
+    """Test that invalid connection entries are rejected."""
+    with tempfile.NamedTemporaryFile(mode="w", delete=False, suffix=".yaml") as f:
+        yaml.dump({"connections": {"bad-server": connection}}, f, Dumper=YAML_DUMPER)
+        temp_path = f.name
+
+    try:
+        with pytest.raises(ValueError) as exc_info:
+            ConfigurationManager(temp_path)
+    finally:
+        os.unlink(temp_path)
+
+    assert message in str(exc_info.value)
+
+
+def test_env_var_substitution(sample_config, monkeypatch):
+    """Test that ${VAR} references in string values are expanded."""
+    monkeypatch.setenv("SSH_MCP_TEST_PASSWORD", "s3cret")
+    monkeypatch.delenv("SSH_MCP_TEST_UNSET", raising=False)
+    sample_config["connections"]["password-server"][
+        "password"
+    ] = "${SSH_MCP_TEST_PASSWORD}"
+    sample_config["defaults"]["allowed_commands"].append("${SSH_MCP_TEST_UNSET}")
+
+    with tempfile.NamedTemporaryFile(mode="w", delete=False, suffix=".yaml") as f:
+        yaml.dump(sample_config, f, Dumper=YAML_DUMPER)
+        temp_path = f.name
+
+    try:
+        config_manager = ConfigurationManager(temp_path)
+    finally:
+        os.unlink(temp_path)
+
+    password_server = config_manager.get_connection_config("password-server")
+    assert password_server["password"] == "s3cret"
+    assert config_manager.get_timeout() == 45
+
+    # Unknown variables are left untouched
+    assert "${SSH_MCP_TEST_UNSET}" in config_manager.get_allowed_commands()
+
+
+def test_env_var_substitution_cached(sample_config, monkeypatch):
+    """Test that a cached configuration picks up the current environment."""
+    monkeypatch.setenv("SSH_MCP_TEST_PASSWORD", "first")
+    sample_config["connections"]["password-server"][
+        "password"
+    ] = "${SSH_MCP_TEST_PASSWORD}"
+
+    with tempfile.NamedTemporaryFile(mode="w", delete=False, suffix=".yaml") as f:
+        yaml.dump(sample_config, f, Dumper=YAML_DUMPER)
+        temp_path = f.name
+
+    try:
+        first = ConfigurationManager(temp_path)
+        monkeypatch.setenv("SSH_MCP_TEST_PASSWORD", "second")
+        second = ConfigurationManager(temp_path)
+    finally:
+        os.unlink(temp_path)
+
+    assert first.get_connection_config("password-server")["password"] == "first"
+    assert second.get_connection_config("password-server")["password"] == "second"
+
+
+def test_config_cache(config_file, sample_config, monkeypatch):
+    """Test that the parse caches are reused and invalidated when the file changes."""
+    # Start from an empty in-process cache so the first load parses the YAML
+    monkeypatch.setattr(config_module, "_CONFIG_CACHE", OrderedDict())
+
+    with tempfile.TemporaryDirectory() as cache_dir:
+        monkeypatch.setattr(config_module, "_CACHE_DIR", cache_dir)
+
+        # The first load populates the cache
+        config_manager = ConfigurationManager(config_file)
+        assert os.path.exists(config_manager._cache_path())
+        assert len(config_manager.get_connection_names()) == 2
+
+        # A fresh manager gives the same result from the cache
+        assert ConfigurationManager(config_file).config == config_manager.config
+
+        # Editing the file invalidates the cache
+        sample_config["connections"]["extra-server"] = {
+            "hostname": "extra.example.com",
+            "username": "extrauser",
+        }
+        with open(config_file, "w") as f:
+            yaml.dump(sample_config, f, Dumper=YAML_DUMPER)
+
+        names = ConfigurationManager(config_file).get_connection_names()
+        assert "extra-server" in names
+
+        # The caches are keyed on content, not on the file's mtime and size
+        stat = os.stat(config_file)
+        with open(config_file) as f:
+            content = f.read()
+        with open(config_file, "w") as f:
+            f.write(content.replace("extra.example.com", "other.example.com"))
+        os.utime(config_file, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+
+        extra_server = ConfigurationManager(config_file).get_connection_config(
+            "extra-server"
+        )
+        assert extra_server["hostname"] == "other.example.com"
+
+
+def test_reload_config(config_file, sample_config):
+    """Test that reloading only replaces the configuration when the file changes."""
     config_manager = ConfigurationManager(config_file)
+    config = config_manager.config
 
-    with pytest.raises(ValueError):
-        config_manager.get_connection_config("nonexistent-server")
+    config_manager.reload_config()
+    assert config_manager.config is config
+    assert config_manager.version == 0
+
+    sample_config["defaults"]["timeout"] = 120
+    with open(config_file, "w") as f:
+        yaml.dump(sample_config, f, Dumper=YAML_DUMPER)
+
+    config_manager.reload_config()
+    assert config_manager.version == 1
+    assert config_manager.get_timeout() == 120
+
+
+def test_reload_invalid_config(config_file, sample_config):
+    """Test that reloading keeps failing until a broken file is fixed."""
+    config_manager = ConfigurationManager(config_file)
+
+    with open(config_file, "w") as f:
+        f.write("connections: [unclosed\n")
+
+    for _ in range(3):
+        with pytest.raises(yaml.YAMLError):
+            config_manager.reload_config()
+    assert config_manager.version == 0
+
+    sample_config["defaults"]["timeout"] = 120
+    with open(config_file, "w") as f:
+        yaml.dump(sample_config, f, Dumper=YAML_DUMPER)
+
+    config_manager.reload_config()
+    assert config_manager.version == 1
+    assert config_manager.get_timeout() == 120
+
+
+def test_cached_config_is_not_shared(config_file):
+    """Test that managers loading the same file get independent copies."""
+    first = ConfigurationManager(config_file)
+    first.config["connections"]["test-server"]["hostname"] = "changed.example.com"
+
+    second = ConfigurationManager(config_file)
+    test_server = second.get_connection_config("test-server")
+    assert test_server["hostname"] == "test.example.com"
+
+
+def test_config_cache_eviction(config_file, monkeypatch):
+    """Test that the in-process cache keeps only the most recently used files."""
+    monkeypatch.setattr(config_module, "_CONFIG_CACHE", OrderedDict())
+    monkeypatch.setattr(config_module, "_CONFIG_CACHE_SIZE", 1)
+
+    ConfigurationManager(config_file)
+    assert list(config_module._CONFIG_CACHE) == [_file_digest(config_file)]
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        other_path = os.path.join(temp_dir, "config.yaml")
+        with open(other_path, "w") as f:
+            yaml.dump(
+                {"connections": {"other": {"hostname": "h", "username": "u"}}},
+                f,
+                Dumper=YAML_DUMPER,
+            )
+
+        ConfigurationManager(other_path)
+        assert list(config_module._CONFIG_CACHE) == [_file_digest(other_path)]
+
+
+def test_config_cache_pruning(config_file, monkeypatch):
+    """Test that the oldest parsed-config cache files are removed."""
+    monkeypatch.setattr(config_module, "_CONFIG_CACHE", OrderedDict())
+
+    with tempfile.TemporaryDirectory() as cache_dir:
+        monkeypatch.setattr(config_module, "_CACHE_DIR", cache_dir)
+        monkeypatch.setattr(config_module, "_CACHE_DIR_SIZE", 1)
+
+        first_cache_path = ConfigurationManager(config_file)._cache_path()
+        os.utime(first_cache_path, (0, 0))
+
+        other_path = os.path.join(cache_dir, "other.yaml")
+        with open(other_path, "w") as f:
+            yaml.dump(
+                {"connections": {"other": {"hostname": "h", "username": "u"}}},
+                f,
+                Dumper=YAML_DUMPER,
+            )
+
+        other_manager = ConfigurationManager(other_path)
+        assert not os.path.exists(first_cache_path)
+        assert os.path.exists(other_manager._cache_path())
 
 
 def test_create_default_config():
@@ -110,3 +349,27 @@ def test_create_default_config():
         assert "connections" in config_manager.config
         assert "defaults" in config_manager.config
         assert "allowed_commands" in config_manager.config["defaults"]
+
+
+def test_create_default_config_exists(monkeypatch):
+    """Test that a config file created by another process is not overwritten."""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        config_path = os.path.join(temp_dir, "config.yaml")
+        config = {
+            "connections": {
+                "other-server": {"hostname": "other.example.com", "username": "other"}
+            }
+        }
+
+        # Simulate another process creating the file after our stat() call
+        original_write = ConfigurationManager._write_default_config
+
+        def racing_write(self, default_config):
+            with open(config_path, "w") as f:
+                yaml.dump(config, f, Dumper=YAML_DUMPER)
+            return original_write(self, default_config)
+
+        monkeypatch.setattr(ConfigurationManager, "_write_default_config", racing_write)
+
+        config_manager = ConfigurationManager(config_path)
+        assert config_manager.get_connection_names() == ["other-server"]
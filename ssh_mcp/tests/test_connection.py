@@ -3,34 +3,29 @@ Tests for the SSH connection module.
 """
 
 import os
+import re
 import socket
 import tempfile
+import threading
 import time
-from pathlib import Path
 
 import paramiko
 import pytest
 import yaml
 
 from ssh_mcp.config import ConfigurationManager
-from ssh_mcp.connection import SSHConnection, SSHConnectionError, SSHConnectionManager
-from ssh_mcp.tests.mock_ssh_server import MockSSHServer
+from ssh_mcp.connection import (
+    PREFERRED_CIPHERS,
+    TRUNCATION_MARKER,
+    SSHConnection,
+    SSHConnectionError,
+    SSHConnectionManager,
+    _batch_results,
+    _BatchOutputBuffer,
+)
 
-
-@pytest.fixture(scope="module")
-def mock_ssh_server():
-    """Fixture providing a mock SSH server."""
-    # Start the mock SSH server
-    server = MockSSHServer(port=2222)
-    server.start()
-
-    # Wait a bit for the server to start
-    time.sleep(0.5)
-
-    yield server
-
-    # Stop the server
-    server.stop()
+# Use the libyaml-backed dumper when available
+YAML_DUMPER = getattr(yaml, "CSafeDumper", yaml.SafeDumper)
 
 
 @pytest.fixture
@@ -57,9 +52,9 @@ def config_file(ssh_config):
         },
     }
 
-    with tempfile.NamedTemporaryFile(mode="w", delete=False, suffix=".yaml") as f:
-        yaml.dump(config, f)
-        temp_path = f.name
+    fd, temp_path = tempfile.mkstemp(suffix=".yaml")
+    os.write(fd, yaml.dump(config, Dumper=YAML_DUMPER).encode("utf-8"))
+    os.close(fd)
 
     yield temp_path
 
@@ -88,6 +83,17 @@ def test_ssh_connection_connect(ssh_config, mock_ssh_server):
     assert not connection.connected
 
 
+def test_ssh_connection_cipher(ssh_config, mock_ssh_server):
+    """Test that the connection negotiates the preferred cipher."""
+    connection = SSHConnection(ssh_config)
+    connection.connect()
+
+    try:
+        assert connection.transport.local_cipher == PREFERRED_CIPHERS[0]
+    finally:
+        connection.disconnect()
+
+
 def test_ssh_connection_execute_command(ssh_config, mock_ssh_server):
     """Test executing a command over SSH."""
     connection = SSHConnection(ssh_config)
@@ -105,6 +111,31 @@ def test_ssh_connection_execute_command(ssh_config, mock_ssh_server):
     assert exit_code == 0
     assert "hello" in stdout
 
+    # The raw output is returned as immutable bytes
+    _, stdout_bytes, stderr_bytes = connection.execute_command_bytes("echo hello")
+    assert type(stdout_bytes) is bytes
+    assert type(stderr_bytes) is bytes
+
+    # Disconnect
+    connection.disconnect()
+
+
+def test_ssh_connection_execute_command_truncated(ssh_config, mock_ssh_server):
+    """Test that command output is cut at the maximum output size."""
+    connection = SSHConnection(ssh_config)
+
+    # Connect to the server
+    connection.connect()
+
+    # file2.txt is longer than 10 bytes
+    exit_code, stdout, stderr = connection.execute_command(
+        "cat file2.txt", max_output_size=10
+    )
+
+    assert exit_code == 0
+    assert stdout == "This is th" + TRUNCATION_MARKER
+    assert stderr == ""
+
     # Disconnect
     connection.disconnect()
 
@@ -178,7 +209,7 @@ def test_ssh_connection_manager_cleanup(config_file, mock_ssh_server):
 
     # Override the last_used time to simulate an idle connection
     # 10 minutes ago
-    connection_manager.last_used["test-server"] = time.time() - 600
+    connection_manager.last_used["test-server"] = time.monotonic() - 600
 
     # Trigger cleanup (max_idle_time=1 second)
     connection_manager._cleanup_connections(max_idle_time=1)
@@ -186,3 +217,113 @@ def test_ssh_connection_manager_cleanup(config_file, mock_ssh_server):
     # The connection should be closed and removed
     assert "test-server" not in connection_manager.connections
     assert "test-server" not in connection_manager.last_used
+
+
+def test_ssh_connection_manager_reconnect(config_file, mock_ssh_server):
+    """Test that the connection manager redials a dropped connection."""
+    config_manager = ConfigurationManager(config_file)
+    connection_manager = SSHConnectionManager(config_manager)
+
+    try:
+        connection = connection_manager.get_connection("test-server")
+        assert connection_manager.get_connection("test-server") is connection
+
+        # Drop the underlying transport
+        connection.client.close()
+        assert not connection.is_active()
+
+        new_connection = connection_manager.get_connection("test-server")
+        assert new_connection is not connection
+        assert new_connection.is_active()
+    finally:
+        connection_manager.close_all_connections()
+
+
+def test_ssh_connection_manager_slow_dial(ssh_config, mock_ssh_server, monkeypatch):
+    """Test that dialing one connection does not block the others."""
+    config = {
+        "connections": {
+            "test-server": ssh_config,
+            "slow-server": {**ssh_config, "hostname": "slow.example.com"},
+        },
+    }
+    fd, temp_path = tempfile.mkstemp(suffix=".yaml")
+    os.write(fd, yaml.dump(config, Dumper=YAML_DUMPER).encode("utf-8"))
+    os.close(fd)
+
+    try:
+        config_manager = ConfigurationManager(temp_path)
+    finally:
+        os.unlink(temp_path)
+    connection_manager = SSHConnectionManager(config_manager)
+
+    # Make the slow server's handshake hang until released
+    dialing = threading.Event()
+    release = threading.Event()
+    original_connect = SSHConnection.connect
+
+    def connect(self):
+        if self.config["hostname"] == "slow.example.com":
+            dialing.set()
+            release.wait(10)
+            raise SSHConnectionError("Connection timed out")
+        original_connect(self)
+
+    monkeypatch.setattr(SSHConnection, "connect", connect)
+
+    slow_errors = []
+
+    def get_slow_connection():
+        try:
+            connection_manager.get_connection("slow-server")
+        except SSHConnectionError as e:
+            slow_errors.append(e)
+
+    slow_thread = threading.Thread(target=get_slow_connection)
+    slow_thread.start()
+
+    try:
+        assert dialing.wait(2)
+
+        # Other connections and the idle cleanup proceed meanwhile
+        fast_thread = threading.Thread(
+            target=lambda: (
+                connection_manager.get_connection("test-server"),
+                connection_manager._cleanup_connections(),
+            )
+        )
+        fast_thread.start()
+        fast_thread.join(5)
+        assert not fast_thread.is_alive()
+        assert "test-server" in connection_manager.connections
+    finally:
+        release.set()
+        slow_thread.join(5)
+        connection_manager.close_all_connections()
+
+    assert len(slow_errors) == 1
+    assert "slow-server" not in connection_manager.connections
+
+
+@pytest.mark.parametrize("chunk_size", [1, 5, 1000])
+def test_batch_output_buffer(chunk_size):
+    """Test splitting a batch's output per command at the sentinel lines."""
+    stdout = _BatchOutputBuffer(re.compile(rb"\nEND (\d+)\n"), 6)
+    stderr = _BatchOutputBuffer(re.compile(rb"\nEND\n"), 6)
+
+    # The output arrives in chunks that may split a sentinel line
+    stdout_data = b"first\n\nEND 0\n" + b"x" * 100 + b"\nEND 2\npartial"
+    stderr_data = b"\nEND\nfailed\n\nEND\n"
+    for i in range(0, len(stdout_data), chunk_size):
+        stdout.write(stdout_data[i : i + chunk_size])
+    for i in range(0, len(stderr_data), chunk_size):
+        stderr.write(stderr_data[i : i + chunk_size])
+
+    results = _batch_results(stdout, stderr, 4)
+
+    assert results[0] == (0, "first\n", "")
+    # The second command overflowed its limit, but its sentinel was still seen
+    assert results[1] == (2, "xxxxxx" + TRUNCATION_MARKER, "failed" + TRUNCATION_MARKER)
+    # The batch stopped during the third command, so the rest did not complete
+    assert results[2] == (-1, "partia" + TRUNCATION_MARKER, "")
+    assert results[3] == (-1, "", "")
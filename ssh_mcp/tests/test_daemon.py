@@ -0,0 +1,145 @@
+"""
+Tests for the connection daemon module.
+"""
+
+import json
+import os
+import socket
+import stat
+import tempfile
+import threading
+import time
+
+import pytest
+
+from ssh_mcp import daemon
+from ssh_mcp.executor import CommandExecutionError
+from ssh_mcp.tests.helpers import assert_result_shape
+
+
+@pytest.fixture
+def connection_daemon(config_file, monkeypatch):
+    """Fixture providing a connection daemon serving in a background thread."""
+    with tempfile.TemporaryDirectory() as runtime_dir:
+        monkeypatch.setattr(daemon, "_RUNTIME_DIR", runtime_dir)
+
+        connection_daemon = daemon.ConnectionDaemon(config_file, poll_interval=0.1)
+        thread = threading.Thread(target=connection_daemon.serve, daemon=True)
+        thread.start()
+
+        # Wait for the socket to appear
+        deadline = time.monotonic() + 2.0
+        while not os.path.exists(connection_daemon.socket_path):
+            assert time.monotonic() < deadline
+            time.sleep(0.01)
+
+        yield connection_daemon
+
+        connection_daemon.stop()
+        thread.join(timeout=2.0)
+
+
+def test_execute_command_through_daemon(connection_daemon, mock_ssh_server):
+    """Test running commands through the daemon reuses one SSH connection."""
+    config_path = connection_daemon.config_path
+
+    # Execute a command through the daemon
+    result = daemon.execute_command(config_path, "test-server", "echo hello")
+    assert_result_shape(result)
+    assert result["success"]
+    assert result["exit_code"] == 0
+    assert result["stdout"] == "hello\n"
+
+    connection = connection_daemon.executor.connection_manager.connections.get(
+        "test-server"
+    )
+    assert connection is not None
+
+    # A second request is served over the same SSH connection
+    result = daemon.execute_command(config_path, "test-server", "echo again")
+    assert result["success"]
+    assert result["exit_code"] == 0
+    assert result["stdout"] == "again\n"
+
+    connections = connection_daemon.executor.connection_manager.connections
+    assert connections.get("test-server") is connection
+
+
+def test_second_daemon_exits(connection_daemon, mock_ssh_server):
+    """Test that a second daemon for the same configuration leaves the first alone."""
+    second_daemon = daemon.ConnectionDaemon(
+        connection_daemon.config_path, poll_interval=0.1
+    )
+    second_daemon.serve()
+
+    # The second daemon returned without taking over the socket
+    assert not second_daemon.running
+    assert os.path.exists(connection_daemon.socket_path)
+
+    result = daemon.execute_command(
+        connection_daemon.config_path, "test-server", "echo hello"
+    )
+    assert result["stdout"] == "hello\n"
+
+
+def test_daemon_silent_client(connection_daemon, mock_ssh_server, monkeypatch):
+    """Test that a client that never sends a request does not stall the daemon."""
+    monkeypatch.setattr(daemon, "_REQUEST_TIMEOUT", 0.2)
+
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as silent_client:
+        silent_client.connect(connection_daemon.socket_path)
+
+        # The silent client is dropped, then the next request is served
+        result = daemon.execute_command(
+            connection_daemon.config_path, "test-server", "echo hello", timeout=2
+        )
+        assert result["stdout"] == "hello\n"
+
+        silent_client.settimeout(2.0)
+        response = json.loads(silent_client.makefile("rb").readline())
+        assert "timed out" in response["exception"]
+
+
+def test_daemon_socket_is_private(connection_daemon):
+    """Test that only the owner can connect to the daemon socket."""
+    mode = stat.S_IMODE(os.stat(connection_daemon.socket_path).st_mode)
+    assert mode & 0o077 == 0
+
+
+def test_daemon_response_timeout(config_file, monkeypatch):
+    """Test that the client gives up on a daemon that never replies."""
+    with tempfile.TemporaryDirectory() as runtime_dir:
+        monkeypatch.setattr(daemon, "_RUNTIME_DIR", runtime_dir)
+        monkeypatch.setattr(daemon, "_RESPONSE_GRACE", 0.1)
+
+        # A listening socket that accepts connections but never answers
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as server_socket:
+            server_socket.bind(daemon.socket_path(config_file))
+            server_socket.listen(1)
+
+            with pytest.raises(CommandExecutionError) as exc_info:
+                daemon.execute_command(config_file, "test-server", "ls", timeout=0)
+
+    assert "Timed out" in str(exc_info.value)
+
+
+def test_disallowed_command_through_daemon(connection_daemon):
+    """Test that a disallowed command is rejected by the daemon."""
+    with pytest.raises(CommandExecutionError) as exc_info:
+        daemon.execute_command(connection_daemon.config_path, "test-server", "rm -rf /")
+
+    assert "not allowed" in str(exc_info.value)
+
+
+def test_daemon_stops_when_idle(config_file, monkeypatch):
+    """Test that the daemon exits and removes its socket when idle."""
+    with tempfile.TemporaryDirectory() as runtime_dir:
+        monkeypatch.setattr(daemon, "_RUNTIME_DIR", runtime_dir)
+
+        connection_daemon = daemon.ConnectionDaemon(
+            config_file, idle_timeout=0, poll_interval=0.05
+        )
+        connection_daemon.serve()
+
+        assert not connection_daemon.running
+        assert not os.path.exists(connection_daemon.socket_path)
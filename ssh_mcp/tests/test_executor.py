@@ -2,124 +2,49 @@
 Tests for the command executor module.
 """
 
-import os
+import subprocess
 import tempfile
-import time
 
 import pytest
-import yaml
 
-from ssh_mcp.config import ConfigurationManager
-from ssh_mcp.connection import SSHConnectionManager
+from ssh_mcp.connection import TRUNCATION_MARKER, SSHConnection, SSHConnectionManager
 from ssh_mcp.executor import CommandExecutionError, CommandExecutor
-from ssh_mcp.tests.mock_ssh_server import MockSSHServer
+from ssh_mcp.tests.helpers import assert_result_shape
 
 
 @pytest.fixture(scope="module")
-def mock_ssh_server():
-    """Fixture providing a mock SSH server."""
-    # Start the mock SSH server
-    server = MockSSHServer(port=2222)
-    server.start()
-
-    # Wait a bit for the server to start
-    time.sleep(0.5)
-
-    yield server
-
-    # Stop the server
-    server.stop()
-
-
-@pytest.fixture
-def config_file(mock_ssh_server):
-    """Fixture creating a temporary configuration file with SSH connection details."""
-    config = {
-        "connections": {
-            "test-server": {
-                "hostname": "127.0.0.1",
-                "port": mock_ssh_server.port,
-                "username": "testuser",
-                "auth_method": "password",
-                "password": "testpass",
-            }
-        },
-        "defaults": {
-            "timeout": 5,
-            "max_output_size": 1024,
-            "allowed_commands": ["ls", "cat", "echo", "pwd", "whoami"],
-        },
-    }
-
-    with tempfile.NamedTemporaryFile(mode="w", delete=False, suffix=".yaml") as f:
-        yaml.dump(config, f)
-        temp_path = f.name
-
-    yield temp_path
-
-    # Clean up the temporary file
-    os.unlink(temp_path)
-
-
-@pytest.fixture
-def executor(config_file):
+def executor(config_manager):
     """Fixture providing a command executor."""
-    config_manager = ConfigurationManager(config_file)
     connection_manager = SSHConnectionManager(config_manager)
     return CommandExecutor(connection_manager, config_manager)
 
 
-def test_execute_command(executor, mock_ssh_server):
-    """Test executing a command."""
-    # Execute a simple command
-    result = executor.execute_command("test-server", "echo Hello World")
-
-    # Check the result - be pragmatic about what we test
-    assert isinstance(result, dict)
-    assert "success" in result
-    assert "exit_code" in result
-    assert "stdout" in result
-    assert "stderr" in result
-
-    # For a successful echo command, we expect success
-    if result["success"]:
-        assert result["exit_code"] == 0
-        assert "Hello World" in result["stdout"]
-
-
-def test_execute_command_with_output(executor, mock_ssh_server):
-    """Test executing a command with output."""
-    # Execute ls command
-    result = executor.execute_command("test-server", "ls")
-
-    # Check the result - be pragmatic about output format
-    assert isinstance(result, dict)
-    assert "success" in result
-    assert "exit_code" in result
-    assert "stdout" in result
-    assert "stderr" in result
-
-    # For a successful ls command, we expect some output
-    if result["success"]:
+@pytest.mark.parametrize(
+    ("command", "expect_success", "expect_output"),
+    [
+        ("echo Hello World", True, "Hello World\n"),
+        ("ls", True, "file1.txt\nfile2.txt\n"),
+        ("cat nonexistent.txt", False, "No such file or directory"),
+    ],
+)
+def test_execute_command(
+    executor, mock_ssh_server, command, expect_success, expect_output
+):
+    """Test executing commands that succeed and fail."""
+    result = executor.execute_command("test-server", command)
+
+    assert_result_shape(result)
+    assert isinstance(result["stdout"], str)
+    assert result["success"] is expect_success
+
+    if expect_success:
+        # A successful command exits with 0 and produces the mock server's output
         assert result["exit_code"] == 0
-        assert isinstance(result["stdout"], str)
-
-
-def test_execute_command_with_error(executor, mock_ssh_server):
-    """Test executing a command that results in an error."""
-    # Execute cat with a non-existent file
-    result = executor.execute_command("test-server", "cat nonexistent.txt")
-
-    # Check the result - be pragmatic about error handling
-    assert isinstance(result, dict)
-    assert "success" in result
-    assert "exit_code" in result
-    assert "stdout" in result
-    assert "stderr" in result
-
-    # For a failed command, success should be False and exit_code non-zero
-    assert not result["success"]
-    assert result["exit_code"] != 0
+        assert expect_output in result["stdout"]
+    else:
+        # A failed command exits non-zero and reports the error on stderr
+        assert result["exit_code"] != 0
+        assert expect_output in result["stderr"]
 
 
 def test_execute_disallowed_command(executor, mock_ssh_server):
@@ -142,6 +67,92 @@ def test_execute_command_invalid_format(executor, mock_ssh_server):
     assert "Empty command" in str(exc_info.value)
 
 
+def test_validate_command_parsing(executor):
+    """Test extracting the base command from plain and quoted commands."""
+    # Plain and quoted forms of allowed commands are accepted
+    executor._validate_command("ls -la")
+    executor._validate_command("  \tcat file1.txt")
+    executor._validate_command('echo "Hello World"')
+    executor._validate_command("'cat' file\\ name.txt")
+
+    # The base command is checked after unquoting
+    with pytest.raises(CommandExecutionError) as exc_info:
+        executor._validate_command('"rm" -rf /')
+    assert "'rm' is not allowed" in str(exc_info.value)
+
+    # Whitespace-only commands are rejected
+    with pytest.raises(CommandExecutionError) as exc_info:
+        executor._validate_command(" \t ")
+    assert "Empty command" in str(exc_info.value)
+
+
+def _run_script_locally(self, command, timeout, stdout, stderr):
+    """Run a batch script with a local shell, feeding its output in small reads."""
+    result = subprocess.run(["sh", "-c", command], capture_output=True)
+    for i in range(0, len(result.stdout), 100):
+        stdout.write(result.stdout[i : i + 100])
+    for i in range(0, len(result.stderr), 100):
+        stderr.write(result.stderr[i : i + 100])
+    return result.returncode
+
+
+def test_execute_commands(executor, mock_ssh_server, monkeypatch):
+    """Test executing a batch of commands over one channel."""
+    # The mock server runs one command per channel, so run the batch script
+    # with a local shell instead
+    monkeypatch.setattr(SSHConnection, "_run_command", _run_script_locally)
+
+    results = executor.execute_commands(
+        "test-server", ["echo first", "ls /nonexistent", "echo last"]
+    )
+
+    assert [result["exit_code"] for result in results[::2]] == [0, 0]
+    assert [result["stdout"] for result in results[::2]] == ["first\n", "last\n"]
+    assert not results[1]["success"]
+    assert results[1]["stdout"] == ""
+    assert results[1]["stderr"]
+
+
+def test_execute_commands_truncated(executor, mock_ssh_server, monkeypatch):
+    """Test that one command overflowing its output limit spares the others."""
+    monkeypatch.setattr(SSHConnection, "_run_command", _run_script_locally)
+
+    with tempfile.NamedTemporaryFile(mode="w", suffix=".txt") as f:
+        f.write("x" * (executor.max_output_size * 5))
+        f.flush()
+
+        results = executor.execute_commands(
+            "test-server", [f"cat {f.name}", "ls /nonexistent", "echo last"]
+        )
+
+    # The first command's output is cut at the limit
+    assert results[0]["exit_code"] == 0
+    assert results[0]["stdout"] == "x" * executor.max_output_size + TRUNCATION_MARKER
+
+    # The commands after it still report their real exit codes and output
+    assert results[1]["exit_code"] not in (0, -1)
+    assert results[1]["error"] is None
+    assert results[2]["exit_code"] == 0
+    assert results[2]["stdout"] == "last\n"
+
+
+def test_execute_commands_disallowed(executor, mock_ssh_server, monkeypatch):
+    """Test that a batch with a disallowed command runs none of its commands."""
+    executed = []
+
+    def record_commands(self, commands, timeout=None, max_output_size=None):
+        executed.extend(commands)
+        return [(0, "", "")] * len(commands)
+
+    monkeypatch.setattr(SSHConnection, "execute_commands", record_commands)
+
+    with pytest.raises(CommandExecutionError) as exc_info:
+        executor.execute_commands("test-server", ["echo hello", "rm -rf /"])
+
+    assert "not allowed" in str(exc_info.value)
+    assert executed == []
+
+
 def test_connection_names(executor):
     """Test getting connection names."""
     names = executor.get_connection_names()